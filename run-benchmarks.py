@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+if __name__ == '__main__':
+    import sys
+    import json
+    import tempfile
+    from pathlib import Path
+    from argparse import ArgumentParser
+
+    from stablogen.benchmark import run_benchmarks, compare
+
+    parser = ArgumentParser(
+        description = 'Time stablogen on a synthetic site'
+    )
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--tags', type=int, default=20)
+    parser.add_argument('--code-blocks', type=int, default=2,
+        help = 'Code blocks per post',
+    )
+    parser.add_argument('--asset-mb', type=float, default=1,
+        help = 'Size of static files in MiB',
+    )
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', metavar='RESULTS_FILE',
+        help = 'Write the results as JSON to this file',
+    )
+    parser.add_argument('--baseline', metavar='BASELINE_FILE',
+        help = 'Fail if slower than the results in this file',
+    )
+    parser.add_argument('--threshold', type=float, default=0.25,
+        help = 'How much slower than the baseline is a regression '
+            '(default: 0.25, which is 25%%)',
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_benchmarks(Path(work_dir),
+            repeat = args.repeat,
+            posts = args.posts,
+            tags = args.tags,
+            code_blocks = args.code_blocks,
+            asset_bytes = int(args.asset_mb * (1 << 20)),
+        )
+
+    for name, result in results['results'].items():
+        print('{:<40} {:9.4f}s (mean {:.4f}s)'.format(
+            name, result['min'], result['mean']
+        ))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=1))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline['site'] != results['site']:
+            sys.exit('Baseline was made with a different site: {}'.format(
+                baseline['site']
+            ))
+        regressions = compare(results, baseline, args.threshold)
+        for name, took, base in regressions:
+            print('REGRESSION: {} took {:.4f}s, baseline {:.4f}s'.format(
+                name, took, base
+            ))
+        if regressions:
+            sys.exit(1)
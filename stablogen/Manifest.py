@@ -0,0 +1,174 @@
+# Python Standard Library
+import json
+
+# 3rd Party Libraries
+from jinja2 import meta, nodes, TemplateNotFound
+
+# Local
+from stablogen.util import hash_text, hash_file
+from stablogen.sync import write_file
+
+# Bump this when the way outputs are produced changes so that old manifests
+# are thrown away instead of trusted.
+manifest_version = 2
+manifest_filename = '.stablogen_manifest.json'
+
+class Manifest:
+    '''Record of what went into the last build of an output directory.
+
+    inputs maps input paths (relative to the input directory) to
+    [mtime_ns, size, sha1] so that files that haven't been touched don't have
+    to be hashed again. outputs maps output paths (relative to the output
+    directory) to a key, which is a hash of everything the output was built
+    from. If the key for an output is the same as last time and the file is
+    still there, it doesn't need to be built again.
+    '''
+
+    def __init__(self, inputs=None, outputs=None, memos=None):
+        self.old_inputs = {} if inputs is None else inputs
+        self.old_outputs = {} if outputs is None else outputs
+        self.old_memos = {} if memos is None else memos
+        self.inputs = {}
+        self.outputs = {}
+        self.memos = {}
+
+    @classmethod
+    def load(cls, output_dir):
+        path = output_dir / manifest_filename
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls()
+        if data.get('version') != manifest_version:
+            return cls()
+        return cls(data['inputs'], data['outputs'], data['memos'])
+
+    def save(self, output_dir):
+        # Not indented, which is a lot quicker to write for big sites
+        write_file(output_dir / manifest_filename, json.dumps(dict(
+            version = manifest_version,
+            inputs = self.inputs,
+            outputs = self.outputs,
+            memos = self.memos,
+        ), sort_keys=True).encode('utf-8'))
+
+    def input_hash(self, input_dir, path):
+        '''Hash of an input file, reusing the last hash if the mtime and size
+        haven't changed.
+        '''
+        rel = str(path.relative_to(input_dir))
+        if rel in self.inputs:
+            return self.inputs[rel][2]
+        st = path.stat()
+        old = self.old_inputs.get(rel)
+        if old is not None and old[:2] == [st.st_mtime_ns, st.st_size]:
+            digest = old[2]
+        else:
+            digest = hash_file(path)
+        self.inputs[rel] = [st.st_mtime_ns, st.st_size, digest]
+        return digest
+
+    def memo(self, name, digest, make):
+        '''Return what make() returned last time for name if digest, a hash
+        of what it was made from, is the same, else call it. What make()
+        returns has to survive being saved as JSON.
+        '''
+        old = self.old_memos.get(name)
+        value = old[1] if old is not None and old[0] == digest else make()
+        self.memos[name] = [digest, value]
+        return value
+
+    def needs_build(self, output_dir, rel, *parts):
+        '''Record the key for output rel made from parts and return True if it
+        has to be (re)built.
+        '''
+        rel = str(rel)
+        key = hash_text('\0'.join(map(str, parts)))
+        self.outputs[rel] = key
+        return (
+            self.old_outputs.get(rel) != key or
+            not (output_dir / rel).is_file()
+        )
+
+    def stale(self):
+        '''Outputs that were built last time but not this time.
+        '''
+        return sorted(set(self.old_outputs) - set(self.outputs))
+
+    def remove_stale(self, output_dir):
+        for rel in self.stale():
+            path = output_dir / rel
+            if path.is_file():
+                path.unlink()
+            # Remove directories left empty by the removal
+            parent = path.parent
+            while parent != output_dir:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    break
+                parent = parent.parent
+
+class TemplateDeps:
+    '''Works out which templates a template pulls in through extends, include,
+    import and from ... import, and which context variables it might use, so
+    that outputs can be keyed on all the templates they were made from.
+    '''
+
+    def __init__(self, env):
+        self.env = env
+        self.sources = {}
+        self.direct = {}
+
+    def references(self, source):
+        '''Return sorted lists of the templates and the variables that the
+        template source uses directly.
+        '''
+        ast = self.env.parse(source)
+        return (
+            # None means the name is only known at render time, ignore
+            # those since there's no way to know what they'll be.
+            sorted(set(filter(None, meta.find_referenced_templates(ast)))),
+            # meta.find_undeclared_variables doesn't look inside blocks
+            # of templates that extend others, so just take every name
+            # that's loaded anywhere.
+            sorted(set(
+                n.name for n in ast.find_all(nodes.Name)
+                if n.ctx == 'load'
+            )),
+        )
+
+    def parse(self, name):
+        if name not in self.direct:
+            try:
+                source = self.env.loader.get_source(self.env, name)[0]
+            except TemplateNotFound:
+                source = ''
+            self.sources[name] = hash_text(source)
+            self.direct[name] = self.references(source)
+        return self.direct[name]
+
+    def closure(self, name, direct=None):
+        '''Return (templates, variables) where templates is a sorted list of
+        (name, hash) of every template name depends on, including itself,
+        and variables is the set of names it might get from the context. If
+        name isn't a template, like post content, give what references()
+        returned for it as direct.
+        '''
+        templates = {}
+        variables = set()
+        if direct is None:
+            todo = [name]
+        else:
+            refs, names = direct
+            todo = list(refs)
+            variables.update(names)
+        while todo:
+            n = todo.pop()
+            if n in templates:
+                continue
+            refs, names = self.parse(n)
+            templates[n] = self.sources[n]
+            variables.update(names)
+            todo.extend(refs)
+        return sorted(templates.items()), variables
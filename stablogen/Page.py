@@ -1,37 +1,25 @@
-import itertools
-from .util import is_empty, has_method
+from collections.abc import Sequence
 
 class Page:
-    # TODO: Possibly seperate the 'user' call  of __init__
-    # (Page(iterable, size)) into a factory function
-
-    # TODO: Create Direct Page Generator instead of generating the pages
-    # all at once in the begining.
-    def __init__(self, iterable, size, context=None):
-        if context is None and iterable is not None and size is not None:
-            # Special Case where I want there to be one page if the iterable
-            # is empty. Else generate the regular pages.This replaced code
-            # later in execution that made it appear that there was always
-            # at least one page when there wasn't. 
-            # (self.pages being [[]] vs [])
-            if is_empty(iterable):  
-                self.pages = [[]]
-            else:
-                self.pages = list(self.paginate(iterable, size))
-            self.index = 0
-            self.length = len(self.pages)
-            self.per_page = size
-        elif context is not None and iterable is None and size is None:
-            self.pages = context['pages']
-            self.index = context['index']
-            self.length = context['length']
-            self.per_page = context['per_page']
-            if self.length <= self.index or self.index < 0:
-                raise IndexError("Invalid Page context, page index is out of"
-                                 "range")
-        else:
-            raise ValueError("Page() has two ways to init, Page(iterable,"
-                             "size) XOR Page(None, None, context=context)")
+    '''A page of a sequence of items, like posts. Pages are views on the
+    sequence, getting the items of a page is just slicing the sequence, so
+    making a Page or going to the next or previous one doesn't copy anything.
+    If what's given isn't a sequence (like a generator), it's put in a list
+    once.
+    '''
+
+    def __init__(self, iterable, size, index=0):
+        if size < 1:
+            raise ValueError("Page size must be at least 1")
+        if not isinstance(iterable, Sequence):
+            iterable = list(iterable)
+        self.items = iterable
+        self.per_page = size
+        # There's always at least one page, even if it's empty
+        self.length = max(1, -(-len(iterable) // size))
+        if self.length <= index or index < 0:
+            raise IndexError("Invalid Page, page index is out of range")
+        self.index = index
 
     def get_pageno(self):
         return self.index + 1
@@ -39,7 +27,11 @@ class Page:
     def get_items(self, index=None):
         if index is None:
             index = self.index
-        return self.pages[index]
+        start = index * self.per_page
+        return self.items[start:start + self.per_page]
+
+    def get_page(self, index):
+        return self.__class__(self.items, self.per_page, index)
 
     def next(self):
         return self.index + 1
@@ -48,12 +40,7 @@ class Page:
         return self.index < (self.length - 1)
 
     def get_next(self):
-        return self.__class__(None, None, context = dict(
-            pages = self.pages,
-            index = self.next(),
-            length = self.length,
-            per_page = self.per_page,
-        ))
+        return self.get_page(self.next())
 
     def prev(self):
         return self.index - 1
@@ -62,25 +49,35 @@ class Page:
         return self.index > 0
 
     def get_prev(self):
-        return self.__class__(None, None, context = dict(
-            pages = self.pages,
-            index = self.prev(),
-            length = self.length,
-            per_page = self.per_page,
-        ))
+        return self.get_page(self.prev())
+
+    def pages(self):
+        '''Generate every page, starting with the first one.
+        '''
+        for index in range(self.length):
+            yield self.get_page(index)
 
     @staticmethod
-    def paginate(iterable, page_size):
-        '''Break a iterable into "pages" of a certain size.
-        Taken from http://stackoverflow.com/a/3744531
+    def paginate(sequence, page_size):
+        '''Break a sequence into "pages" of a certain size.
         '''
-        while True:
-            i1, i2 = itertools.tee(iterable)
-            iterable, page = (itertools.islice(i1, page_size, None),
-                    list(itertools.islice(i2, page_size)))
-            if len(page) == 0:
-                break
-            yield page
+        for start in range(0, len(sequence), page_size):
+            yield sequence[start:start + page_size]
+
+    # URLs, the first page is at base_url, the rest at base_url/N where N is
+    # the page number.
+    def url(self, base_url, index=None):
+        if index is None:
+            index = self.index
+        if index == 0:
+            return base_url + '/'
+        return '{}/{}/'.format(base_url, index + 1)
+
+    def next_url(self, base_url):
+        return self.url(base_url, self.next())
+
+    def prev_url(self, base_url):
+        return self.url(base_url, self.prev())
 
     # Iteration methods
     def __iter__(self):
@@ -104,4 +101,3 @@ class Page:
 
     def print(self):
         return str(self)
-
@@ -1,64 +1,143 @@
 # Python Standard Library
+import sys
 from collections import OrderedDict
-import itertools
-
-# 3rd Party Libraries
-import arrow, yaml
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 
 # Local
 from stablogen.config import *
-from stablogen.util import make_url, find_files
+from stablogen.util import make_url
+from stablogen.dates import Timestamp, arrow_tag, represent_timestamp, \
+    construct_timestamp
+from stablogen import timing
 
-# Uses OrderedDict to keep order the data in the order below
-yaml.add_representer(OrderedDict, lambda self, data:
-    self.represent_mapping('tag:yaml.org,2002:map', data.items())
-)
 post_yaml_tags = ('title', 'tags', 'created', 'when', 'last_edited')
+post_date_tags = ('created', 'when', 'last_edited')
+
+@lru_cache(maxsize=None)
+def post_yaml():
+    '''Import and set up PyYAML for post files, only when a post file has
+    to be read or written. Returns the module and the loader to use.
+    '''
+    import yaml
 
-# Support Arrow Objects in PyYAML (At least date time equilvalent)
-arrow_tag='!arrow.Arrow'
-yaml.add_representer(arrow.Arrow, lambda dumper, data:
-    dumper.represent_scalar(arrow_tag, str(data))
-)
-yaml.add_constructor(arrow_tag, lambda loader, node:
-    arrow.get(loader.construct_scalar(node))
-)
+    # Uses OrderedDict to keep order the data in the order below
+    yaml.add_representer(OrderedDict, lambda self, data:
+        self.represent_mapping('tag:yaml.org,2002:map', data.items())
+    )
+    # Dates are written like Arrow objects used to be
+    yaml.add_representer(Timestamp, represent_timestamp)
+    # Use the faster libyaml loader if PyYAML was built with it
+    loader = getattr(yaml, 'CLoader', yaml.Loader)
+    for l in set((yaml.Loader, loader)):
+        yaml.add_constructor(arrow_tag, construct_timestamp, Loader = l)
+    return yaml, loader
+
+# Parsed post meta information is cached in the input directory, this has to
+# change if what's cached does.
+post_cache_version = 3
 
 # Core code
 class Post:
-    '''Core type of the program, represents a post in the blog.
+    '''Core type of the program, represents a post in the blog. The posts of
+    a site are kept by a Site.
     '''
-    inventory = dict()
-    loaded = False
+    # There can be a lot of posts, so they don't get a __dict__
+    __slots__ = (
+        'title', 'url', 'source', 'content_offset', 'tags', 'when',
+        'last_edited', 'created', 'extension',
+        '_raw_content', '_render_env', '_rendered',
+    )
 
     def __init__(
         self, title, content, tags=[], url=None, when=None,
-        last_edited = None, created = None, extension = None
+        last_edited = None, created = None, extension = None, source = None,
+        content_offset = None
     ):
         self.title = title
         self.url = make_url(title, url)
+        self.source = source
+        self.content_offset = content_offset
         self.content = content
-        self.tags = tags
-        self.when = when
-        self.last_edited = last_edited
-        self.created = created
+        # Tag names are shared by all the posts that have them
+        self.tags = [sys.intern(tag) for tag in tags]
+        self.when = Timestamp.get(when)
+        self.last_edited = Timestamp.get(last_edited)
+        self.created = Timestamp.get(created)
         self.extension = extension
 
+    # If content is None and the post has a source file, what's in the file
+    # at content_offset is read when it's first used and can be dropped
+    # again with release().
+    @property
+    def raw_content(self):
+        if self._raw_content is None:
+            if self.source is None or self.content_offset is None:
+                return ''
+            with self.source.open() as f:
+                f.seek(self.content_offset)
+                self._raw_content = f.read()
+        return self._raw_content
+
+    @raw_content.setter
+    def raw_content(self, value):
+        self._raw_content = value
+
+    def release(self):
+        '''Drop the content if it can be read again from the source file.
+        '''
+        if self.source is not None and self.content_offset is not None:
+            self._raw_content = None
+            self._rendered = None
+
+    # Content is rendered by Jinja the first time it's used after
+    # render_content() is called, so posts that aren't written out again by an
+    # incremental build don't have to be rendered. What was in the post file
+    # is kept in raw_content.
+    @property
+    def content(self):
+        if self._render_env is not None and self._rendered is None:
+            with timing.span('content', self.url):
+                self._rendered = self._render_env.from_string(
+                    self.raw_content
+                ).render()
+        return self.raw_content if self._rendered is None else self._rendered
+
+    @content.setter
+    def content(self, value):
+        self.raw_content = value
+        self._render_env = None
+        self._rendered = None
+
+    def render_content(self, env):
+        self._render_env = env
+        self._rendered = None
+
+    def __getstate__(self):
+        # Jinja environments can't be pickled, render_content() has to be
+        # called again after unpickling.
+        # Content that can be read from the source file isn't sent either.
+        state = dict((name, getattr(self, name)) for name in self.__slots__)
+        state['_render_env'] = None
+        state['_rendered'] = None
+        if self.source is not None and self.content_offset is not None:
+            state['_raw_content'] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        # Tag names aren't interned again by pickle
+        self.tags = [sys.intern(tag) for tag in self.tags]
+
     def create(self):
-        self.created = arrow.utcnow()
+        self.created = Timestamp.utcnow()
 
     def finalize(self):
-        self.when = arrow.utcnow()
+        self.when = Timestamp.utcnow()
 
     def edit(self):
-        self.last_edited = arrow.utcnow()
-
-    def apply_tags(self):
-        for tag in self.tags:
-            if tag in Tag.inventory.keys():
-                Tag.inventory[tag].add_post(self)
-            else:
-                Tag.inventory[tag] = Tag(tag, [self])
+        self.last_edited = Timestamp.utcnow()
 
     def __str__(self):
         rest = (" " + self.when.humanize()) if self.when is not None else ""
@@ -68,59 +147,69 @@ class Post:
         return '<' + self.__class__.__name__ + ': ' + str(self) + '>'
 
     @staticmethod
-    def load(post_file):
+    def read_header(post_file):
+        '''Read just the YAML meta information at the start of a post file,
+        up to the first blank line. Returns it and the offset in the file of
+        the content after the blank line.
+        '''
+        header = []
+        with post_file.open() as f:
+            while True:
+                line = f.readline()
+                if not line.strip():
+                    break
+                header.append(line)
+            offset = f.tell()
+        yaml, loader = post_yaml()
+        return yaml.load(''.join(header), Loader = loader), offset
+
+    @staticmethod
+    def load(post_file, cache=None):
+        '''Load a post from a file without reading its content, which is
+        read when it's used. If a FileCache is given, the meta information is
+        taken from it if the file hasn't changed.
+        '''
         if not post_file.is_file():
             return None
-        
-        lines = iter(post_file.read_text().split('\n'))
-        m = yaml.load('\n'.join(itertools.takewhile(str.strip, lines)))
+
+        if cache is None:
+            m, offset = Post.read_header(post_file)
+        else:
+            m, offset = cache.get(post_file,
+                lambda: Post.read_header(post_file)
+            )
         return Post(
             title = m['title'],
             tags = m['tags'],
-            content = '\n'.join(lines),
+            content = None,
             created = m['created'],
             when = m['when'],
             last_edited = m['last_edited'],
             extension = post_file.suffix,
+            source = post_file,
+            content_offset = offset,
         )
 
-    @classmethod
-    def load_all(cls, input_dir):
-        if not cls.loaded:
-            for post_file in find_files(
-                input_dir/posts_dirname,
-                exts = post_file_exts
-            ):
-                post = cls.load(post_file)
-                if post is None:
-                    continue
-                post.apply_tags()
-                Post.inventory[post.url] = post
-            cls.loaded = True
-
     def save(self, posts_dir):
         if not posts_dir.is_dir():
             posts_dir.mkdir(parents=True, exist_ok=True)
 
+        yaml, loader = post_yaml()
         ordered = OrderedDict()
         for tag in post_yaml_tags:
             ordered[tag] = getattr(self, tag)
+            if tag in post_date_tags:
+                ordered[tag] = Timestamp.get(ordered[tag])
         posts_dir.joinpath(self.url + self.extension).write_text(
-            yaml.dump(ordered) + '\n' + self.content
+            yaml.dump(ordered) + '\n' + self.raw_content
         )
 
-    @classmethod
-    def get_finalized(cls, input_dir, final=True):
-        cls.load_all(input_dir)
-        if final:
-            is_final = lambda p: p.when is not None
-        else:
-            is_final = lambda p: p.when is None
-        return sorted(
-            filter(is_final, cls.inventory.values()),
-            key=lambda p: p.when,
-            reverse=True
-        )
+    def listing(self):
+        '''What lists of posts show about a post, used to tell if a listing
+        needs to be regenerated.
+        '''
+        return (self.url, self.title, str(self.when), str(self.last_edited),
+            tuple(self.tags))
 
     def date(self, fmt = 'YYYY-MM-DD'):
         when = "" if self.when is None else self.when.format(fmt)
@@ -130,23 +219,92 @@ class Post:
         return when + last_edited
 
 class Tag:
-    inventory = dict()
+    __slots__ = ('name', 'url', 'posts', 'post_set')
 
-    def __init__(self, name, posts=[]):
-        self.name = name
+    def __init__(self, name, posts=None):
+        self.name = sys.intern(name)
         self.url = make_url(name)
-        self.posts = posts
+        self.posts = []
+        self.post_set = set()
+        for post in posts or ():
+            self.add_post(post)
 
     def add_post(self, post):
-        if post not in self.posts:
+        if post not in self.post_set:
             self.posts.append(post)
+            self.post_set.add(post)
+
+    def __contains__(self, post):
+        return post in self.post_set
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.name = sys.intern(self.name)
+
+class PostIndex:
+    '''Sorted views of the posts and tags, made once when the posts are
+    loaded and shared by everything that needs them. None of the lists should
+    be changed.
 
-    @classmethod
-    def get_most_tagged(cls, input_dir):
-        Post.load_all(input_dir)
-        return sorted(
-            cls.inventory.values(),
+    by_when is the finalized posts, newest first, drafts is the posts that
+    aren't finalized and by_created is all the posts, both newest created
+    first. most_tagged is the tags, the ones with the most posts first. For
+    archives, finalized posts are bucketed by the UTC year and month of when
+    they were finalized, see archive().
+    '''
+
+    def __init__(self, posts, tags):
+        posts = list(posts)
+        self.by_when = sorted(
+            (p for p in posts if p.when is not None),
+            key = lambda p: p.when,
+            reverse = True
+        )
+        self.drafts = sorted(
+            (p for p in posts if p.when is None),
+            key = lambda p: p.created,
+            reverse = True
+        )
+        self.by_created = sorted(
+            posts,
+            key = lambda p: p.created,
+            reverse = True
+        )
+        self.tags = dict((t.name, t) for t in tags)
+        self.most_tagged = sorted(
+            self.tags.values(),
             key = lambda t: len(t.posts),
             reverse = True
         )
 
+        # Oldest first so they can be searched with bisect
+        self._ascending = self.by_when[::-1]
+        self._month_keys = [
+            (w.year, w.month)
+            for w in (p.when.to('utc') for p in self._ascending)
+        ]
+
+    def tagged(self, post, name):
+        tag = self.tags.get(name)
+        return tag is not None and post in tag
+
+    def archive(self, year, month=None):
+        '''Finalized posts from a year or a month of a year, newest first.
+        '''
+        lo = bisect_left(self._month_keys, (year, month or 1))
+        hi = bisect_right(self._month_keys, (year, month or 12))
+        return self._ascending[lo:hi][::-1]
+
+    def months(self):
+        '''(year, month) of every month with a finalized post, newest
+        first.
+        '''
+        return sorted(set(self._month_keys), reverse=True)
+
+    def years(self):
+        return sorted(set(y for y, m in self._month_keys), reverse=True)
+
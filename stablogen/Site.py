@@ -0,0 +1,85 @@
+# Local
+from stablogen.config import *
+from stablogen.Post import Post, Tag, PostIndex, post_cache_version
+from stablogen.util import find_files
+from stablogen.cache import FileCache
+
+class Site:
+    '''The posts and tags of the blog in an input directory. Each site keeps
+    its own, so one process can build more than one site.
+
+    posts maps URLs to Posts and tags maps names to Tags. Posts are loaded
+    by load() the first time they're needed.
+    '''
+
+    def __init__(self, input_dir):
+        self.input_dir = input_dir
+        self.posts = dict()
+        self.tags = dict()
+        self.loaded = False
+        # PostIndex of the posts, made by get_index() when it's needed
+        self.index = None
+
+    def apply_tags(self, post):
+        for tag in post.tags:
+            if tag in self.tags:
+                self.tags[tag].add_post(post)
+            else:
+                self.tags[tag] = Tag(tag, [post])
+
+    def load(self):
+        if not self.loaded:
+            cache = FileCache(
+                self.input_dir / cache_dirname / 'posts.pickle',
+                post_cache_version,
+            )
+            for post_file in find_files(
+                self.input_dir/posts_dirname,
+                exts = post_file_exts
+            ):
+                post = Post.load(post_file, cache)
+                if post is None:
+                    continue
+                self.apply_tags(post)
+                self.posts[post.url] = post
+            cache.save()
+            self.loaded = True
+            self.index = None
+        return self
+
+    def update(self, post_files):
+        '''Load the given post files again, for when they have been changed,
+        added or removed since load().
+        '''
+        self.load()
+        by_source = dict((p.source, p) for p in self.posts.values())
+        for post_file in post_files:
+            old = by_source.get(post_file)
+            post = Post.load(post_file)
+            if old is not None and (post is None or post.url != old.url):
+                del self.posts[old.url]
+            if post is not None:
+                # Keeps the place of the old post if it had the same URL
+                self.posts[post.url] = post
+
+        self.tags.clear()
+        for post in self.posts.values():
+            self.apply_tags(post)
+        self.index = None
+
+    def get_index(self):
+        self.load()
+        if self.index is None:
+            self.index = PostIndex(self.posts.values(), self.tags.values())
+        return self.index
+
+    def get_finalized(self, final=True):
+        '''Finalized posts, newest first, or if final is False, posts that
+        aren't finalized, newest created first. The list is shared, so it
+        shouldn't be changed.
+        '''
+        index = self.get_index()
+        return index.by_when if final else index.drafts
+
+    def get_most_tagged(self):
+        return self.get_index().most_tagged
@@ -0,0 +1,212 @@
+# Output to a tar or zip archive instead of a directory, see ArchiveOutput.
+
+# Python Standard Library
+import io
+import os
+import time
+import shutil
+import tempfile
+import threading
+from pathlib import PurePosixPath
+
+# Local
+from stablogen.sync import umask
+
+# Archive formats by the suffix of the output path
+archive_suffixes = (
+    ('.tar', 'tar'),
+    ('.tar.gz', 'tar.gz'),
+    ('.tgz', 'tar.gz'),
+    ('.tar.bz2', 'tar.bz2'),
+    ('.tar.xz', 'tar.xz'),
+    ('.zip', 'zip'),
+)
+
+# Earliest time a zip file can have
+zip_epoch = 315532800
+
+def archive_format(path):
+    '''Return the format of the archive at path, like "tar.gz", or None if it
+    isn't the path of an archive.
+    '''
+    name = str(path).lower()
+    for suffix, fmt in archive_suffixes:
+        if name.endswith(suffix):
+            return fmt
+    return None
+
+def archive_mtime():
+    '''Time every entry in an archive has, SOURCE_DATE_EPOCH if it's set,
+    so the same site always makes the same archive.
+    '''
+    try:
+        return int(os.environ['SOURCE_DATE_EPOCH'])
+    except (KeyError, ValueError):
+        return 0
+
+class ArchiveOutput:
+    '''Where generate() puts the outputs of a site that's built into an
+    archive. Rendered outputs are spooled to a temporary file next to the
+    archive as they are written, with only where they are in it kept in
+    memory, and copied files are read from where they are when the archive
+    is written by close(). Entries are written in order of their paths, with
+    the same time, owner and permissions, so archives of the same site are
+    the same byte for byte. It can be used from more than one thread, like
+    by Compressor.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.format = archive_format(path)
+        if self.format is None:
+            raise ValueError('Not an archive: ' + repr(str(path)))
+        self.dirs = set()
+        # rel: (offset, size) in spool or the path of a file to copy
+        self.files = {}
+        # Made when the first output is written, it doesn't have a name so
+        # it's gone when it's closed, even if close() is never called.
+        self.spool = None
+        self.lock = threading.Lock()
+
+    def add_parents(self, rel):
+        for parent in PurePosixPath(rel).parents:
+            if str(parent) != '.':
+                self.dirs.add(str(parent))
+
+    def mkdir(self, rel):
+        with self.lock:
+            self.dirs.add(str(rel))
+            self.add_parents(rel)
+
+    def write(self, rel, data):
+        with self.lock:
+            if self.spool is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.spool = tempfile.TemporaryFile(dir=str(self.path.parent))
+            offset = self.spool.seek(0, io.SEEK_END)
+            self.spool.write(data)
+            self.files[str(rel)] = (offset, len(data))
+            self.add_parents(rel)
+
+    def copy(self, src, rel, src_stat=None):
+        with self.lock:
+            self.files[str(rel)] = src
+            self.add_parents(rel)
+
+    # Nothing is copied until close()
+    def flush(self):
+        pass
+
+    def read(self, rel):
+        with self.lock:
+            data = self.files[rel]
+            if not isinstance(data, tuple):
+                return data.read_bytes()
+            offset, size = data
+            self.spool.seek(offset)
+            return self.spool.read(size)
+
+    def size(self, rel):
+        with self.lock:
+            data = self.files[rel]
+        return data[1] if isinstance(data, tuple) else data.stat().st_size
+
+    def entries(self):
+        '''(rel, data) of every entry in the order they're written, data
+        being None for directories, the bytes of rendered outputs, which are
+        only read from the spool when they're reached, or the path of a file
+        to copy.
+        '''
+        with self.lock:
+            entries = sorted(
+                [(d, None) for d in self.dirs] + list(self.files.items()),
+                key = lambda e: e[0]
+            )
+        for rel, data in entries:
+            yield rel, self.read(rel) if isinstance(data, tuple) else data
+
+    def close(self):
+        '''Write the archive, replacing what's at path only when it's done.
+        '''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(
+            dir=str(self.path.parent), prefix='.tmp', suffix='.archive'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if self.format == 'zip':
+                    self.write_zip(f)
+                else:
+                    self.write_tar(f)
+            os.chmod(tmp, 0o666 & ~umask)
+            os.replace(tmp, str(self.path))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        finally:
+            if self.spool is not None:
+                self.spool.close()
+                self.spool = None
+
+    def write_tar(self, f):
+        import tarfile
+
+        mtime = archive_mtime()
+        compression = self.format[len('tar.'):]
+        if compression == 'gz':
+            import gzip
+            # No name or time in the header
+            fileobj = gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0)
+        elif compression == 'bz2':
+            import bz2
+            fileobj = bz2.BZ2File(f, 'wb')
+        elif compression == 'xz':
+            import lzma
+            fileobj = lzma.LZMAFile(f, 'wb')
+        else:
+            fileobj = f
+        try:
+            with tarfile.open(
+                fileobj=fileobj, mode='w|', format=tarfile.PAX_FORMAT
+            ) as tar:
+                for rel, data in self.entries():
+                    info = tarfile.TarInfo(rel)
+                    info.mtime = mtime
+                    if data is None:
+                        info.type = tarfile.DIRTYPE
+                        info.mode = 0o755
+                        tar.addfile(info)
+                    elif isinstance(data, bytes):
+                        info.mode = 0o644
+                        info.size = len(data)
+                        tar.addfile(info, io.BytesIO(data))
+                    else:
+                        info.mode = 0o644
+                        with data.open('rb') as src:
+                            info.size = os.fstat(src.fileno()).st_size
+                            tar.addfile(info, src)
+        finally:
+            if fileobj is not f:
+                fileobj.close()
+
+    def write_zip(self, f):
+        import zipfile
+
+        date_time = time.gmtime(max(archive_mtime(), zip_epoch))[:6]
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for rel, data in self.entries():
+                if data is None:
+                    info = zipfile.ZipInfo(rel + '/', date_time)
+                    info.external_attr = (0o40755 << 16) | 0x10
+                    info.create_system = 3
+                    zf.writestr(info, b'')
+                    continue
+                info = zipfile.ZipInfo(rel, date_time)
+                info.external_attr = 0o100644 << 16
+                info.create_system = 3
+                info.compress_type = zipfile.ZIP_DEFLATED
+                if isinstance(data, bytes):
+                    zf.writestr(info, data)
+                else:
+                    with data.open('rb') as src, zf.open(info, 'w') as dst:
+                        shutil.copyfileobj(src, dst)
@@ -0,0 +1,53 @@
+# Static assets with the hash of their contents in their names, so they can
+# be cached forever, see AssetMap.
+
+# Python Standard Library
+import json
+from pathlib import PurePosixPath
+
+# Written to the output, maps the names of assets to their fingerprinted
+# paths, both relative to the output directory.
+asset_manifest_filename = 'assets.json'
+
+# Hex digits of the hash that go in the name
+fingerprint_length = 10
+
+def fingerprinted_path(rel, digest):
+    '''Where the copy of the asset at rel with the hash digest goes, like
+    static/style.0123456789.css for static/style.css.
+    '''
+    p = PurePosixPath(rel)
+    return str(p.with_name('{}.{}{}'.format(
+        p.stem, digest[:fingerprint_length], p.suffix
+    )))
+
+class AssetMap:
+    '''The fingerprinted copies of the assets in the output, used by
+    templates as asset(name) to get the URL of an asset:
+
+        <link rel="stylesheet" href="{{ asset('/static/style.css') }}" />
+
+    assets maps the paths of assets relative to the output directory to the
+    paths of their fingerprinted copies. Everything else, including every
+    asset if fingerprinting is off, just gets its own URL.
+    '''
+
+    def __init__(self, assets=None):
+        self.assets = {} if assets is None else assets
+
+    def __call__(self, name):
+        path = self.assets.get(name.lstrip('/'))
+        if path is None:
+            return name
+        return ('/' if name.startswith('/') else '') + path
+
+    def manifest(self):
+        '''Return the contents of the asset manifest.
+        '''
+        return json.dumps(
+            self.assets, indent=1, sort_keys=True
+        ).encode('utf-8')
+
+    # Used as the fingerprint of the global, see generate.fingerprint()
+    def __repr__(self):
+        return 'AssetMap({!r})'.format(sorted(self.assets.items()))
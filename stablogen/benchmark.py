@@ -0,0 +1,182 @@
+# Python Standard Library
+import os
+import sys
+import time
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+# 3rd Party Libraries
+import arrow
+
+# Local
+from stablogen.config import *
+from stablogen.Post import Post
+from stablogen.Site import Site
+from stablogen.code import code_highlight
+from stablogen.generate import generate, setup_jinja
+from stablogen.bytecode import BytecodeCache
+
+# Code for code blocks, the last one has no lexer so it's guessed
+code_samples = [
+    ('python', 'def f{0}(x):\n    return [i * {0} for i in range(x)]\n'),
+    ('c', 'int f{0}(int x) {{\n    return x * {0};\n}}\n'),
+    ('javascript',
+        'function f{0}(x) {{\n    return x.map(i => i * {0});\n}}\n'
+    ),
+    ('rust', 'fn f{0}(x: u32) -> u32 {{\n    x * {0}\n}}\n'),
+    ('bash', 'for i in $(seq {0}); do\n    echo "$i"\ndone\n'),
+    ('not-a-language', '#!/usr/bin/env python\nprint({0})\n'),
+]
+
+def make_site(input_dir, posts=200, tags=20, code_blocks=2, asset_bytes=0,
+    seed=0
+):
+    '''Make a synthetic input directory with posts, tags that are used
+    following a Zipf-like distribution, code blocks in different languages in
+    each post and asset_bytes of static files.
+    '''
+    rng = random.Random(seed)
+    if input_dir.exists():
+        shutil.rmtree(str(input_dir))
+    posts_dir = input_dir / posts_dirname
+    posts_dir.mkdir(parents=True)
+
+    start = arrow.get('2016-01-01T00:00:00+00:00')
+    tag_names = ['tag {}'.format(i) for i in range(tags)]
+    weights = [1 / (i + 1) for i in range(tags)]
+    for i in range(posts):
+        post_tags = sorted(set(
+            rng.choices(tag_names, weights, k=rng.randint(1, 4))
+        )) if tags else []
+        paragraphs = '\n'.join(
+            '<p>Paragraph {} of post {}. '.format(j, i) + 'Lorem ipsum ' * 20 +
+            '</p>'
+            for j in range(rng.randint(3, 15))
+        )
+        code = '\n'.join(
+            "{{% code '{}', 'file{}' %}}\n{}{{% endcode %}}".format(
+                language, j, sample.format(i * 10 + j)
+            )
+            for j, (language, sample) in enumerate(
+                rng.choice(code_samples) for k in range(code_blocks)
+            )
+        )
+        p = Post('Post number {}'.format(i), paragraphs + '\n' + code,
+            tags = post_tags, extension = post_file_exts[0],
+        )
+        p.created = start.shift(days=i)
+        # Every tenth post is a draft
+        p.when = None if i % 10 == 9 else p.created.shift(hours=1)
+        p.save(posts_dir)
+
+    static_dir = input_dir / 'static'
+    static_dir.mkdir()
+    (static_dir / 'style.css').write_text('body { margin: 0; }\n')
+    remaining = asset_bytes
+    n = 0
+    while remaining > 0:
+        size = min(remaining, rng.randint(1 << 10, 1 << 20))
+        (static_dir / 'asset{}.bin'.format(n)).write_bytes(os.urandom(size))
+        remaining -= size
+        n += 1
+
+    (input_dir / 'about_me.html').write_text(
+        '{% extends "page.html" %}{% block content %}About{% endblock %}\n'
+    )
+
+def clear_cache(input_dir):
+    shutil.rmtree(str(input_dir / cache_dirname), ignore_errors=True)
+
+def time_runs(func, repeat, setup=None):
+    runs = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return dict(min=min(runs), mean=sum(runs) / len(runs), runs=runs)
+
+def run_command(input_dir, *args):
+    '''Run the stablogen script in another process, so startup is included.
+    '''
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(root)] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else [])
+    )
+    subprocess.run(
+        [sys.executable, str(root / 'bin' / 'stablogen'),
+            '-i', str(input_dir)] + list(args),
+        env = env, check = True, stdout = subprocess.DEVNULL,
+    )
+
+def run_benchmarks(work_dir, repeat=3, **site):
+    '''Make a synthetic site in work_dir and time loading, highlighting,
+    setting up Jinja, generating and the -p, -t and -f commands. Returns a
+    dictionary of the results.
+    '''
+    input_dir = work_dir / 'input'
+    output_dir = work_dir / 'output'
+    make_site(input_dir, **site)
+    # Has to match only one post
+    last_post = 'post_number_{}'.format(site.get('posts', 200) - 1)
+    results = dict()
+
+    def cold():
+        clear_cache(input_dir)
+        BytecodeCache.memory.clear()
+
+    results['load_all (cold)'] = time_runs(
+        lambda: Site(input_dir).load(), repeat, cold
+    )
+    results['load_all (warm)'] = time_runs(
+        lambda: Site(input_dir).load(), repeat
+    )
+
+    samples = [(l, s.format(i)) for i, (l, s) in enumerate(code_samples)]
+    def highlight_all():
+        for full in (True, False):
+            for language, code in samples:
+                code_highlight(full, language, 'file', code)
+    results['code_highlight'] = time_runs(highlight_all, repeat)
+
+    results['setup_jinja'] = time_runs(
+        lambda: setup_jinja(Site(input_dir)), repeat
+    )
+
+    results['generate (cold)'] = time_runs(
+        lambda: generate(input_dir, output_dir), repeat, cold
+    )
+    results['generate (warm)'] = time_runs(
+        lambda: generate(input_dir, output_dir), repeat
+    )
+    results['generate (incremental, no changes)'] = time_runs(
+        lambda: generate(input_dir, output_dir, incremental=True), repeat
+    )
+
+    results['command -p'] = time_runs(
+        lambda: run_command(input_dir, '-p'), repeat
+    )
+    results['command -t'] = time_runs(
+        lambda: run_command(input_dir, '-t'), repeat
+    )
+    results['command -f'] = time_runs(
+        lambda: run_command(input_dir, '-f', last_post), repeat
+    )
+
+    return dict(site=site, repeat=repeat, results=results)
+
+def compare(results, baseline, threshold):
+    '''Return a list of (name, time, baseline time) of the benchmarks that
+    got slower than baseline by more than threshold (0.2 is 20%), comparing
+    the best runs.
+    '''
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is not None and result['min'] > base['min'] * (1 + threshold):
+            regressions.append((name, result['min'], base['min']))
+    return regressions
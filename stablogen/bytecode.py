@@ -0,0 +1,109 @@
+# Python Standard Library
+import os
+import tempfile
+
+# 3rd Party Libraries
+import jinja2
+from jinja2.bccache import FileSystemBytecodeCache
+from jinja2.utils import LRUCache
+
+# Local
+from stablogen.util import hash_text
+
+class BytecodeCache(FileSystemBytecodeCache):
+    '''Jinja bytecode cache in a directory that counts hits and misses and
+    writes entries atomically, so concurrent builds can share it.
+
+    Compiled templates are also kept in memory for every cache in the
+    process, keyed by the name and hash of the source, so sites built by the
+    same process share them, like the templates that come with stablogen.
+    '''
+
+    # (key, checksum): code, of the most recently used templates
+    memory = LRUCache(2000)
+
+    def __init__(self, directory):
+        super().__init__(str(directory), '%s.cache')
+        self.hits = 0
+        self.misses = 0
+
+    def load_bytecode(self, bucket):
+        code = self.memory.get((bucket.key, bucket.checksum))
+        if code is not None:
+            bucket.code = code
+            self.hits += 1
+            return
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.memory[bucket.key, bucket.checksum] = bucket.code
+
+    def dump_bytecode(self, bucket):
+        self.memory[bucket.key, bucket.checksum] = bucket.code
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.replace(tmp, self._get_cache_filename(bucket))
+        except OSError:
+            pass
+
+class Environment(jinja2.Environment):
+    '''Jinja Environment that also caches templates made with from_string(),
+    which is how post content is rendered. They are kept in memory and in
+    string_bytecode_cache keyed by the hash of their source, so posts that
+    haven't changed don't have to be lexed, parsed or compiled again.
+    '''
+
+    def __init__(self, *args, string_bytecode_cache=None, **kw):
+        super().__init__(*args, **kw)
+        self.string_bytecode_cache = string_bytecode_cache
+        self.string_cache = LRUCache(400)
+        self.string_memory_hits = 0
+
+    def from_string(self, source, globals=None, template_class=None):
+        bcc = self.string_bytecode_cache
+        if bcc is None:
+            return super().from_string(source, globals, template_class)
+
+        key = hash_text(source)
+        code = self.string_cache.get(key)
+        if code is None:
+            bucket = bcc.get_bucket(self, '<string>', key, source)
+            code = bucket.code
+            if code is None:
+                code = bucket.code = self.compile(source)
+                bcc.set_bucket(bucket)
+            self.string_cache[key] = code
+        else:
+            self.string_memory_hits += 1
+
+        cls = template_class or self.template_class
+        return cls.from_code(self, code, self.make_globals(globals), None)
+
+def cache_stats(env):
+    '''Lines describing how well the caches of an environment from
+    setup_jinja() did in this process.
+    '''
+    def line(name, hits, misses):
+        total = hits + misses
+        return '{}: {} hits, {} misses ({:.0%} hit rate)'.format(
+            name, hits, misses, hits / total if total else 0
+        )
+
+    lines = []
+    if env.bytecode_cache is not None:
+        lines.append(line('Templates',
+            env.bytecode_cache.hits, env.bytecode_cache.misses
+        ))
+    if env.string_bytecode_cache is not None:
+        lines.append(line('Post content',
+            env.string_memory_hits + env.string_bytecode_cache.hits,
+            env.string_bytecode_cache.misses
+        ))
+    lines.append(line('Highlighted code',
+        env.code_cache.hits, env.code_cache.misses
+    ))
+    return lines
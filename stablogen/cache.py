@@ -0,0 +1,73 @@
+# Python Standard Library
+import os
+import pickle
+
+# Local
+from stablogen.config import *
+
+def load_pickle(path, version):
+    '''Load what save_pickle saved at path, or None if it's not there, can't
+    be read or was saved with a different version.
+    '''
+    try:
+        with path.open('rb') as f:
+            saved_version, data = pickle.load(f)
+    except Exception:
+        return None
+    return data if saved_version == version else None
+
+def save_pickle(path, version, data):
+    '''Save data to path along with a version. The data is written to a
+    temporary file that is then moved into place, so other processes either
+    see the old file or the new one, never part of one. If it can't be saved
+    nothing happens, since it's just a cache.
+    '''
+    # Only needed when something changed, so it's imported here
+    import tempfile
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((version, data), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, str(path))
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+class FileCache:
+    '''Cache of something derived from files, stored at path. An entry is
+    used only if the file's mtime and size are the same as when the entry was
+    made. Only entries used since the cache was loaded are saved, so entries
+    of files that are gone get dropped.
+    '''
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.old_entries = load_pickle(path, version) or {}
+        self.entries = {}
+        self.changed = False
+
+    def get(self, file, make):
+        '''Return the entry for the pathlib.Path file, calling make() to make
+        it if there isn't one or the file changed.
+        '''
+        st = file.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        name = str(file)
+        entry = self.old_entries.get(name)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, make())
+            self.changed = True
+        self.entries[name] = entry
+        return entry[1]
+
+    def save(self):
+        if self.changed or len(self.entries) != len(self.old_entries):
+            save_pickle(self.path, self.version, self.entries)
@@ -1,6 +1,12 @@
+# Python Standard Library
+import os
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+
+# 3rd Party Libraries
 from jinja2 import nodes
 from jinja2.ext import Extension
-
 import pygments
 from pygments import highlight
 from pygments.lexers import get_lexer_by_name, guess_lexer
@@ -9,6 +15,11 @@ from pygments.style import Style
 from pygments.token import Keyword, Name, Comment, String, Error, \
      Number, Operator, Generic
 
+# Local
+from stablogen.util import hash_text
+from stablogen import timing
+from stablogen.sync import write_file
+
 class InlineCodeHtmlFormatter(HtmlFormatter):
     def wrap(self, source, outfile):
         return self._wrap_code(source)
@@ -38,21 +49,121 @@ iformatter = InlineCodeHtmlFormatter(
     nobackground = True,
 )
 
-def code_highlight(full, language, filename, code):
+@lru_cache(maxsize=None)
+def get_lexer(language):
+    '''Lexer for a language name, or None if Pygments doesn't have one.
+    Lexers are reused since making them is slow.
+    '''
     try:
-        lexer = get_lexer_by_name(language, stripall=True)
-        insert = highlight(code, lexer, formatter if full else iformatter)
-        highlighted = True
+        return get_lexer_by_name(language, stripall=True)
     except pygments.util.ClassNotFound:
+        return None
+
+def highlight_code(full, language, code):
+    lexer = get_lexer(language)
+    if lexer is None:
         try:
-            insert = guess_lexer(code)
-            highlighted = True
+            lexer = guess_lexer(code)
         except pygments.util.ClassNotFound:
-            insert = code
-            highlighted = False
-
-    if not full and highlighted:
+            return code
+    insert = highlight(code, lexer, formatter if full else iformatter)
+    if not full:
         insert = insert[:-1] # Remove new line Pygments puts in for some reason
+    return insert
+
+class HighlightCache:
+    '''Highlighted code, kept in a LRU dictionary in memory and, if
+    directory is given, in files named by their key in that directory. When
+    the files take up more than max_bytes, prune() removes the least recently
+    used ones.
+    '''
+
+    def __init__(self, directory=None, max_entries=1024, max_bytes=32 << 20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(full, language, code):
+        return hash_text('\0'.join((
+            pygments.__version__, style_key(),
+            'full' if full else 'inline', str(language), code,
+        )))
+
+    def path(self, key):
+        return self.directory / key[:2] / key[2:]
+
+    def get(self, full, language, code):
+        key = self.key(full, language, code)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+
+        insert = None
+        if self.directory is not None:
+            path = self.path(key)
+            try:
+                insert = path.read_text()
+                os.utime(str(path)) # Mark as recently used for prune()
+                self.hits += 1
+            except OSError:
+                pass
+        if insert is None:
+            insert = highlight_code(full, language, code)
+            self.misses += 1
+            if self.directory is not None:
+                self.write(path, insert)
+
+        self.memory[key] = insert
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+        return insert
+
+    @staticmethod
+    def write(path, text):
+        '''Write to a temporary file and move it into place so that other
+        processes never read part of an entry.
+        '''
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp, str(path))
+        except OSError:
+            pass
+
+    def prune(self):
+        if self.directory is None or not self.directory.is_dir():
+            return
+        entries = []
+        total = 0
+        for path in self.directory.glob('*/*'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            total -= size
+
+def code_highlight(full, language, filename, code, cache=None):
+    insert = (
+        highlight_code(full, language, code) if cache is None
+        else cache.get(full, language, code)
+    )
 
     return (
         '<div class="codebox">{0}'
@@ -68,8 +179,16 @@ def code_highlight(full, language, filename, code):
         insert
     )
 
+@lru_cache(maxsize=None)
+def code_style():
+    return formatter.get_style_defs('.codebox')
+
+@lru_cache(maxsize=None)
+def style_key():
+    return hash_text(code_style())
+
 def output_code_style(path):
-    path.write_text(formatter.get_style_defs('.codebox'))
+    write_file(path, code_style().encode('utf-8'))
 
 def parse_expr_if(parser):
     if parser.stream.skip_if('comma'):
@@ -83,6 +202,7 @@ class CodeExtension(Extension):
     def __init__(self, environment):
         super().__init__(environment)
         environment.extend(
+            code_cache = HighlightCache(),
         )
 
     def parse(self, parser):
@@ -125,5 +245,14 @@ class CodeExtension(Extension):
         ).set_lineno(lineno)
 
     def _code_highlight_call(self, *args, **kw):
-        return code_highlight(args[0], args[1], args[2], kw['caller']())
+        code = kw['caller']()
+        with timing.span('highlight',
+            '{} {} ({} lines)'.format(
+                args[1], args[2] or '', code.count('\n') + 1
+            ),
+            full = args[0],
+        ):
+            return code_highlight(
+                args[0], args[1], args[2], code, self.environment.code_cache
+            )
 
@@ -1,18 +1,21 @@
 # Python Standard Library
 import sys
+import time
 
 # Local
-from stablogen.generate import generate
+# Only what every command needs is imported here, the rest is imported by the
+# commands that need it so that quick commands like -p start quickly.
 from stablogen.config import *
 from stablogen.Post import *
-from stablogen.util import find_files
+from stablogen.Site import Site
+from stablogen.slugs import SlugIndex
 
 def new(input_dir, title):
     '''Creates a empty post with a title supplied
     '''
     url = make_url(title)
     posts_dir = input_dir / posts_dirname
-    preexisting = find_files(posts_dir, url, post_file_exts, False)
+    preexisting = SlugIndex.for_input(input_dir).find(url)
     if preexisting:
         sys.exit('Result URL Slug: "{}" is already taken by:\n{}'.format(
             url, '\n'.join(map(lambda i: '"{}"'.format(i), preexisting))
@@ -22,8 +25,8 @@ def new(input_dir, title):
     p.save(posts_dir)
 
 # Not a command, helper for finalized and edited
-def check_for_multiple(posts_dir, url):
-    files = find_files(posts_dir, url, post_file_exts, False)
+def check_for_multiple(input_dir, url):
+    files = SlugIndex.for_input(input_dir).find(url)
     n = len(files)
     if n > 1:
         sys.exit('There are multiple posts starting with "{}":\n{}'.format(
@@ -35,13 +38,13 @@ def check_for_multiple(posts_dir, url):
 
 def finalized(input_dir, url):
     posts_dir = input_dir / posts_dirname
-    p = check_for_multiple(posts_dir, url)
+    p = check_for_multiple(input_dir, url)
     p.finalize()
     p.save(posts_dir)
 
 def edited(input_dir, url):
     posts_dir = input_dir / posts_dirname
-    p = check_for_multiple(posts_dir, url)
+    p = check_for_multiple(input_dir, url)
     p.edit()
     p.save(posts_dir)
 
@@ -49,18 +52,153 @@ def list_tags(input_dir):
     '''Sort them by decreasing number of posts they have, then secondarily
     alphabetically by name.
     '''
-    Post.load_all(input_dir)
-    for tag in sorted(Tag.inventory.values(),
+    for tag in sorted(Site(input_dir).load().tags.values(),
         key = lambda tag: (-len(tag.posts), tag.name)
     ):
         print(tag.name, len(tag.posts))
 
 def list_posts(input_dir):
-    Post.load_all(input_dir)
-    for post in sorted(
-        Post.inventory.values(),
-        key=lambda p: p.created,
-        reverse = True
-    ):
+    for post in Site(input_dir).get_index().by_created:
         print(post)
 
+
+def profile(input_dir, output_dir, trace_path, incremental=False, jobs=1,
+    shard=None, check_links=False
+):
+    '''Generate the site while timing everything, then print a summary and
+    write a Chrome trace to trace_path. Returns what generate() does.
+    '''
+    from stablogen import timing
+    from stablogen.generate import generate
+
+    profiler = timing.start()
+    try:
+        report = generate(input_dir, output_dir, incremental, jobs,
+            shard=shard, check_links=check_links
+        )
+    finally:
+        timing.stop()
+    if jobs > 1:
+        print('Pages were rendered by other processes, so they are not '
+            'broken down.')
+    print(profiler.summary())
+    profiler.write_trace(trace_path)
+    print('Wrote trace to "{}"'.format(str(trace_path)))
+    return report
+
+def merge_shards(shard_dirs, output_dir):
+    '''Put the output directories of shards made with --shard together.
+    '''
+    from stablogen.generate import merge
+
+    problems = merge(shard_dirs, output_dir)
+    if problems:
+        sys.exit('Can\'t merge the shards:\n' + '\n'.join(problems))
+
+def read_batch(batch_path):
+    '''Read a batch file, which has an input directory and an output
+    directory on each line, quoted like in a shell if they have spaces.
+    Empty lines and lines starting with # are skipped. Relative paths are
+    relative to the directory of the batch file.
+    '''
+    import shlex
+
+    sites = []
+    for n, line in enumerate(batch_path.read_text().splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        paths = shlex.split(line)
+        if len(paths) != 2:
+            sys.exit('{}:{}: Expected INPUT_DIR OUTPUT_DIR'.format(
+                str(batch_path), n
+            ))
+        sites.append(tuple(batch_path.parent / p for p in paths))
+    return sites
+
+def batch(batch_path, incremental=False, jobs=1):
+    '''Generate every site in a batch file in this process, see
+    read_batch().
+    '''
+    from stablogen.generate import generate_batch
+
+    sites = read_batch(batch_path)
+    for input_dir, output_dir in sites:
+        if not input_dir.is_dir():
+            sys.exit(
+                'Input Directory: "{}" does not exist!'.format(str(input_dir))
+            )
+    start = time.time()
+    failed = generate_batch(sites, incremental, jobs)
+    for input_dir, e in failed:
+        print('Error building "{}": {}'.format(str(input_dir), e))
+    print('Built {} of {} sites in {:.3f}s'.format(
+        len(sites) - len(failed), len(sites), time.time() - start
+    ))
+    if failed:
+        sys.exit(1)
+
+def watch(input_dir, output_dir, jobs=1, check_links=False, watcher=None):
+    '''Generate the site, then keep generating it incrementally when
+    something in the input directory changes. Stays running with the posts
+    loaded and the templates compiled, so only changed posts are loaded again.
+    A rebuild that fails, like because a post is half saved, is reported and
+    tried again with the next change. watcher is what to wait on for changes,
+    by default make_watcher(input_dir).
+    '''
+    from stablogen.watch import make_watcher
+    from stablogen.generate import generate, setup_jinja
+
+    site = Site(input_dir)
+    env = setup_jinja(site)
+    generate(input_dir, output_dir, True, jobs, env, check_links=check_links)
+    posts_dir = input_dir / posts_dirname
+    if watcher is None:
+        watcher = make_watcher(input_dir)
+    print('Watching "{}" for changes'.format(str(input_dir)))
+    # Changes of rebuilds that failed, so they're loaded again next time
+    pending = set()
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.time()
+            pending |= changed
+            try:
+                if input_dir / config_filename in pending:
+                    env.globals['config'] = load_config(input_dir)
+                site.update([p for p in pending
+                    if p.parent == posts_dir and p.suffix in post_file_exts
+                ])
+                generate(input_dir, output_dir, True, jobs, env,
+                    check_links=check_links
+                )
+            except Exception as e:
+                print('Error: {}: {}'.format(type(e).__name__, e))
+                continue
+            print('Rebuilt in {:.3f}s ({} file(s) changed)'.format(
+                time.time() - start, len(pending)
+            ))
+            pending.clear()
+    except KeyboardInterrupt:
+        pass
+
+def serve(input_dir, port=8000):
+    '''Serve a preview of the site, rendering pages when they're asked for
+    and keeping up with changes to the input directory.
+    '''
+    import threading
+    from stablogen.serve import Preview, make_server, watch_preview
+
+    preview = Preview(input_dir)
+    server = make_server(preview, port)
+    threading.Thread(
+        target=watch_preview, args=(preview,), daemon=True
+    ).start()
+    print('Serving a preview of "{}" at http://localhost:{}/'.format(
+        str(input_dir), server.server_address[1]
+    ))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
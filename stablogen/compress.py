@@ -0,0 +1,94 @@
+# Compressed copies of output files, like index.html.gz next to index.html,
+# for web servers that can serve them as is, like nginx's gzip_static.
+
+# Python Standard Library
+import os
+import bz2
+import gzip
+import lzma
+from concurrent.futures import ThreadPoolExecutor
+
+# Local
+from stablogen.sync import write_file
+
+def gzip_compress(data, level):
+    # mtime is 0 so the same data always compresses the same
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def bz2_compress(data, level):
+    return bz2.compress(data, max(1, level))
+
+def xz_compress(data, level):
+    return lzma.compress(data, preset=level)
+
+# Codecs that can be used, name: (suffix, function(data, level))
+codecs = dict(
+    gzip = ('.gz', gzip_compress),
+    bz2 = ('.bz2', bz2_compress),
+    xz = ('.xz', xz_compress),
+)
+
+def compressed_suffixes():
+    return tuple(suffix for suffix, func in codecs.values())
+
+def check_codecs(names):
+    for name in names:
+        if name not in codecs:
+            raise ValueError('Invalid compression codec: ' + repr(name))
+
+def compress_file(path, names, level):
+    '''Write path compressed with each of the codecs named in names next to
+    it. Returns how many were written.
+    '''
+    data = path.read_bytes()
+    written = 0
+    for name in names:
+        suffix, func = codecs[name]
+        if write_file(
+            path.with_name(path.name + suffix), func(data, level)
+        ):
+            written += 1
+    return written
+
+def compress_output(output, rel, names, level):
+    '''Like compress_file(), but for the output rel of an ArchiveOutput.
+    '''
+    data = output.read(rel)
+    for name in names:
+        suffix, func = codecs[name]
+        output.write(rel + suffix, func(data, level))
+    return len(names)
+
+class Compressor:
+    '''Compresses files on a thread pool, the codecs release the GIL while
+    they work. Use as a context manager, everything is done when it exits.
+    '''
+
+    def __init__(self, names, level=9, threads=None):
+        if isinstance(names, str):
+            names = [names]
+        check_codecs(names)
+        self.names = names
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=threads or os.cpu_count())
+        self.futures = []
+        self.written = 0
+
+    def compress(self, path):
+        self.futures.append(
+            self.pool.submit(compress_file, path, self.names, self.level)
+        )
+
+    def compress_output(self, output, rel):
+        self.futures.append(self.pool.submit(
+            compress_output, output, rel, self.names, self.level
+        ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown()
+        for future in self.futures:
+            self.written += future.result()
+        return False
@@ -8,6 +8,8 @@ config_filename = 'stablogen.yaml'
 templates_dirname = 'templates'
 posts_dirname = 'posts'
 tags_dirname = 'tags'
+# Hidden, so generate() doesn't copy it to the output
+cache_dirname = '.stablogen_cache'
 
 # Look for these file extensions in the posts directory
 post_file_exts = (
@@ -21,3 +23,50 @@ RENDER_EXTENTIONS = (
 )
 
 PYGMENTS_CSS_OUTPUT = 'static/code.css'
+
+# Settings that can be changed in the config file in the input directory
+default_config = dict(
+    # Number of posts on each page of the post index and tag pages
+    posts_per_page = 10,
+    # How files are copied to the output: "copy", "hardlink" or "reflink".
+    # Links fall back to copying if they can't be made.
+    copy_mode = 'copy',
+    # Codecs to write compressed copies of outputs with, from "gzip", "bz2"
+    # and "xz", like ["gzip"] for index.html.gz. None by default.
+    compress = [],
+    # Compression level, 0 to 9
+    compress_level = 9,
+    # Outputs with these extensions that are at least compress_min_size bytes
+    # are compressed.
+    compress_types = ['.html', '.css', '.js', '.json', '.xml', '.svg', '.txt'],
+    compress_min_size = 256,
+    # Remove whitespace and comments that don't matter from HTML outputs,
+    # static/code.css and copied CSS files.
+    minify = False,
+    # Write a search index of the finalized posts to search/, split by the
+    # first search_prefix_length characters of the terms.
+    search = False,
+    search_prefix_length = 2,
+    # Widths in pixels to make smaller copies of images at, like [480, 960],
+    # for srcset(). Needs Pillow. None by default.
+    images = [],
+    image_types = ['.jpg', '.jpeg', '.png', '.webp'],
+    # Quality of JPEG and WebP copies, 1 to 95
+    image_quality = 85,
+    # Also write copies of the static/code.css and copied files with these
+    # extensions with the hash of their contents in their names, for asset()
+    # and assets.json.
+    fingerprint = False,
+    fingerprint_types = ['.css', '.js'],
+)
+
+def load_config(input_dir):
+    '''Return the settings in the config file in input_dir, using
+    default_config for what isn't there.
+    '''
+    config = dict(default_config)
+    path = input_dir / config_filename
+    if path.is_file():
+        import yaml
+        config.update(yaml.safe_load(path.read_text()) or {})
+    return config
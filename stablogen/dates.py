@@ -0,0 +1,130 @@
+# Dates of posts. Arrow is slow to import and to make objects with, so dates
+# are kept as datetimes and an Arrow object is only made if something only
+# Arrow can do is used, like humanize().
+
+# Python Standard Library
+from datetime import datetime, timezone
+
+# Tag of dates in post files
+arrow_tag = '!arrow.Arrow'
+
+class Timestamp:
+    '''A timezone aware date and time that can be used like an Arrow object.
+    Comparing, formatting as YYYY-MM-DD, str() and converting to UTC are done
+    with the datetime, anything else is done by Arrow.
+    '''
+    __slots__ = ('datetime', '_arrow')
+
+    def __init__(self, dt):
+        if dt.tzinfo is None:
+            # Like Arrow, assume UTC
+            dt = dt.replace(tzinfo=timezone.utc)
+        self.datetime = dt
+        self._arrow = None
+
+    @classmethod
+    def get(cls, value):
+        '''Make a Timestamp from an ISO 8601 string, a datetime, an Arrow
+        object or a Timestamp. None stays None.
+        '''
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            try:
+                return cls(datetime.fromisoformat(value))
+            except ValueError:
+                # Something else Arrow can parse
+                import arrow
+                return cls(arrow.get(value).datetime)
+        if isinstance(value, datetime):
+            return cls(value)
+        # Arrow object
+        return cls(value.datetime)
+
+    @classmethod
+    def utcnow(cls):
+        return cls(datetime.now(timezone.utc))
+
+    @property
+    def arrow(self):
+        if self._arrow is None:
+            import arrow
+            self._arrow = arrow.get(self.datetime)
+        return self._arrow
+
+    # The Arrow object isn't pickled, it can be made again
+    def __getstate__(self):
+        return self.datetime
+
+    def __setstate__(self, state):
+        self.datetime = state
+        self._arrow = None
+
+    def __getattr__(self, name):
+        # Everything else Arrow objects have
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.arrow, name)
+
+    year = property(lambda self: self.datetime.year)
+    month = property(lambda self: self.datetime.month)
+    day = property(lambda self: self.datetime.day)
+
+    def to(self, tz):
+        if tz in ('utc', 'UTC'):
+            return Timestamp(self.datetime.astimezone(timezone.utc))
+        return self.arrow.to(tz)
+
+    def format(self, fmt='YYYY-MM-DD HH:mm:ssZZ'):
+        if fmt == 'YYYY-MM-DD':
+            return self.datetime.strftime('%Y-%m-%d')
+        return self.arrow.format(fmt)
+
+    def isoformat(self):
+        return self.datetime.isoformat()
+
+    def __str__(self):
+        return self.datetime.isoformat()
+
+    def __repr__(self):
+        return '<{} [{}]>'.format(self.__class__.__name__, str(self))
+
+    def __hash__(self):
+        return hash(self.datetime)
+
+    # Compares with Timestamps, datetimes and Arrow objects
+    @staticmethod
+    def _other(other):
+        if isinstance(other, datetime):
+            return other
+        return getattr(other, 'datetime', None)
+
+    def _compare(self, other, op):
+        other = self._other(other)
+        if other is None:
+            return NotImplemented
+        return op(self.datetime, other)
+
+    def __eq__(self, other):
+        return self._compare(other, datetime.__eq__)
+
+    def __ne__(self, other):
+        return self._compare(other, datetime.__ne__)
+
+    def __lt__(self, other):
+        return self._compare(other, datetime.__lt__)
+
+    def __le__(self, other):
+        return self._compare(other, datetime.__le__)
+
+    def __gt__(self, other):
+        return self._compare(other, datetime.__gt__)
+
+    def __ge__(self, other):
+        return self._compare(other, datetime.__ge__)
+
+def represent_timestamp(dumper, data):
+    return dumper.represent_scalar(arrow_tag, str(data))
+
+def construct_timestamp(loader, node):
+    return Timestamp.get(loader.construct_scalar(node))
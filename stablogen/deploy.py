@@ -0,0 +1,80 @@
+# Python Standard Library
+import json
+
+# Local
+from stablogen.util import hash_file
+from stablogen.sync import walk_files, write_file
+
+deploy_version = 1
+deploy_filename = '.stablogen_deploy.json'
+deploy_diff_filename = '.stablogen_deploy_diff.json'
+
+class DeployManifest:
+    '''Content hashes of the files in an output directory, for deploying it.
+
+    files maps paths (relative to the output directory) to their sha1 and
+    stats maps them to [mtime_ns, size], so files that weren't written again
+    don't have to be hashed again.
+    '''
+
+    def __init__(self, files=None, stats=None):
+        self.files = {} if files is None else files
+        self.stats = {} if stats is None else stats
+
+    @classmethod
+    def load(cls, output_dir):
+        path = output_dir / deploy_filename
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls()
+        if data.get('version') != deploy_version:
+            return cls()
+        return cls(data['files'], data['stats'])
+
+    @classmethod
+    def scan(cls, output_dir, old=None, skip=()):
+        '''Hash all the files in output_dir except the ones in skip, reusing
+        the hashes in old, a DeployManifest from before, if the mtime and size
+        are the same.
+        '''
+        if old is None:
+            old = cls()
+        manifest = cls()
+        for rel, entry in sorted(walk_files(output_dir, skip)):
+            st = entry.stat()
+            stat = [st.st_mtime_ns, st.st_size]
+            if old.stats.get(rel) == stat:
+                digest = old.files[rel]
+            else:
+                digest = hash_file(output_dir / rel)
+            manifest.files[rel] = digest
+            manifest.stats[rel] = stat
+        return manifest
+
+    def diff(self, old):
+        '''Return a dict of sorted lists of the paths that were added,
+        changed and removed since old.
+        '''
+        return dict(
+            added = sorted(set(self.files) - set(old.files)),
+            changed = sorted(
+                rel for rel, digest in self.files.items()
+                if rel in old.files and old.files[rel] != digest
+            ),
+            removed = sorted(set(old.files) - set(self.files)),
+        )
+
+    def save(self, output_dir, old=None):
+        '''Write the manifest and, if old is given, the diff against it.
+        '''
+        # Not indented, which is a lot quicker to write for big sites
+        write_file(output_dir / deploy_filename, json.dumps(dict(
+            version = deploy_version,
+            files = self.files,
+            stats = self.stats,
+        ), sort_keys=True).encode('utf-8'))
+        if old is not None:
+            write_file(output_dir / deploy_diff_filename, json.dumps(
+                self.diff(old), indent=1, sort_keys=True
+            ).encode('utf-8'))
@@ -1,22 +1,59 @@
 # Python Standard Library
-import re
-from shutil import rmtree, copyfile
+import pickle
+import itertools
+from shutil import rmtree
 
 # 3rd Party Libraries
-from jinja2 import Environment, PackageLoader, FileSystemLoader, ChoiceLoader
+from jinja2 import PackageLoader, FileSystemLoader, ChoiceLoader
+import pygments
 
 # Local
 from stablogen.config import *
 from stablogen.Post import *
-from stablogen.code import CodeExtension, output_code_style
+from stablogen.Site import Site
+from stablogen.Page import Page
+from stablogen.code import CodeExtension, HighlightCache, code_style, \
+    style_key
+from stablogen.Manifest import Manifest, TemplateDeps, manifest_filename
+from stablogen.sync import scan_tree, DirectoryOutput, list_files, \
+    link_tree, relink_paths, swap_dirs, copy_file, write_file
+from stablogen.archive import ArchiveOutput, archive_format
+from stablogen.compress import Compressor, compressed_suffixes, codecs
+from stablogen.minify import MinifyStats, minify_html, minify_css
+from stablogen.search import SearchIndex
+from stablogen.images import ImageSet, build_images
+from stablogen.assets import AssetMap, fingerprinted_path, \
+    asset_manifest_filename
+from stablogen.util import hash_text, hash_file, make_url, process_pool
+from stablogen.links import find_links, LinkReport
+from stablogen.deploy import DeployManifest, deploy_filename, \
+    deploy_diff_filename
+from stablogen.shard import in_shard, save_shard, shard_filename, \
+    check_shards
+from stablogen import timing
+from stablogen.bytecode import Environment, BytecodeCache, cache_stats
+
+def setup_jinja(site):
+    '''Make the Jinja environment for a Site, which is kept as its site
+    attribute.
+    '''
+    input_dir = site.input_dir
 
-def setup_jinja(input_dir):
     def guess_autoescape(template_name):
         if template_name is None or '.' not in template_name:
             return False
         ext = template_name.rsplit('.', 1)[1]
         return ext in ('html', 'htm', 'xml')
 
+    # Compiled templates are cached in the input directory, if possible
+    jinja_cache_dir = input_dir / cache_dirname / 'jinja'
+    try:
+        jinja_cache_dir.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = BytecodeCache(jinja_cache_dir)
+        string_bytecode_cache = BytecodeCache(jinja_cache_dir)
+    except OSError:
+        bytecode_cache = string_bytecode_cache = None
+
     env = Environment(
         autoescape = False,
         loader = ChoiceLoader([
@@ -28,126 +65,717 @@ def setup_jinja(input_dir):
             CodeExtension,
         ],
         trim_blocks = True,
+        bytecode_cache = bytecode_cache,
+        string_bytecode_cache = string_bytecode_cache,
     )
+    env.code_cache = HighlightCache(input_dir / cache_dirname / 'highlight')
+    env.site = site
+    # Tags are linked by the URL of their directory, not their name
+    env.filters['make_url'] = make_url
+    env.globals['config'] = load_config(input_dir)
 
-    latest_posts = Post.get_finalized(input_dir)
     env.globals.update(dict(
         HOSTNAME = 'https://fred.hornsey.us',
         DISQUS_NAME = 'iguessthislldo',
+    ))
+    # Replaced by generate() with the images it made derivatives of and the
+    # assets it fingerprinted
+    env.globals['srcset'] = ImageSet()
+    env.globals['asset'] = AssetMap()
+    update_globals(env)
+
+    return env
+
+def update_globals(env):
+    '''Set the globals that depend on the posts.
+    '''
+    latest_posts = env.site.get_finalized()
+    env.globals.update(dict(
         latest_posts = latest_posts,
         latest_post = latest_posts[0] if len(latest_posts) > 0 else None,
+        # For archives and other listings, see PostIndex
+        post_index = env.site.get_index(),
     ))
 
-    return env
+def fingerprint(value, post_hash):
+    '''String that changes when a global variable given to templates does.
+    '''
+    if isinstance(value, Post):
+        return repr(value.listing()) + post_hash(value)
+    if isinstance(value, PostIndex):
+        return fingerprint(value.by_created, post_hash) + repr(
+            [(t.name, [p.url for p in t.posts]) for t in value.most_tagged]
+        )
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(fingerprint(v, post_hash) for v in value) + ']'
+    return repr(value)
+
+# Template used to render each kind of page, see render()
+page_templates = dict(
+    post = 'post.html',
+    tag = 'tag.html',
+    list_posts = 'list_posts.html',
+    list_tags = 'list_tags.html',
+)
+
+# Name of the profiling phase of each kind of page
+page_phases = dict(
+    page = 'page render',
+    post = 'post pages',
+    tag = 'tag pages',
+    list_posts = 'page render',
+    list_tags = 'tag pages',
+)
+
+def render(env, kind, name):
+    '''Render one page of the site of env. kind is "page" for a regular page
+    with name being the template, "post" with name being the key in
+    Site.posts, "tag" with name being the key in Site.tags and the page
+    index, "list_posts" with name being the page index or "list_tags".
+    '''
+    template = name if kind == 'page' else page_templates.get(kind)
+    if template is None:
+        raise ValueError('Unknown kind of page: ' + repr(kind))
+    with timing.span(kind, str(name)), \
+            timing.span('template', template, page=str(name)):
+        template = env.get_template(template)
+        if kind == 'page':
+            return template.render()
+        elif kind == 'post':
+            post = env.site.posts[name]
+            try:
+                return template.render(post=post)
+            finally:
+                # Only read the content again if something else uses it
+                post.release()
+        elif kind == 'tag':
+            name, index = name
+            tag = env.site.tags[name]
+            return template.render(tag=tag, page=Page(
+                tag.posts, env.globals['config']['posts_per_page'], index
+            ))
+        elif kind == 'list_posts':
+            return template.render(page=Page(
+                env.globals['latest_posts'],
+                env.globals['config']['posts_per_page'],
+                name
+            ))
+        elif kind == 'list_tags':
+            return template.render(tags=env.site.get_most_tagged())
+
+def render_page(env, kind, name):
+    '''Render a page like render() and minify it if the minify setting is
+    on. Returns (text, size before minifying or None).
+    '''
+    text = render(env, kind, name)
+    if not env.globals['config']['minify']:
+        return text, None
+    with timing.span('minify', str(name)):
+        return minify_html(text), len(text.encode('utf-8'))
+
+def render_output(env, kind, name, check_links=False):
+    '''Render a page like render_page(). Returns (text, size before
+    minifying or None, links in the page from find_links() if check_links is
+    True or None).
+    '''
+    text, before = render_page(env, kind, name)
+    if not check_links:
+        return text, before, None
+    with timing.span('links', str(name)):
+        return text, before, find_links(text)
+
+def write_pages(output, pages, rendered, minify_stats, links):
+    '''Put rendered pages in output, a DirectoryOutput or an ArchiveOutput,
+    and the links found in them in the dict links.
+    '''
+    for (rel, kind, name), (text, before, found) in zip(pages, rendered):
+        data = text.encode('utf-8')
+        if before is not None:
+            minify_stats.add('html', before, len(data))
+        output.write(rel, data)
+        if found is not None:
+            links[str(rel)] = found
+
+# Files in the output directory that are about the build, not part of the site
+build_files = (
+    manifest_filename, deploy_filename, deploy_diff_filename, shard_filename
+)
 
-def generate(input_dir, output_dir):
+def staging_dir(output_dir):
+    '''Where the site is built before it replaces output_dir.
+    '''
+    return output_dir.parent / ('.' + output_dir.name + '.staging')
+
+# In the staging directory when it has the build before the one in the output
+# directory, has the hash of the deploy manifest of the output directory
+staging_marker = '.stablogen_staging'
+
+def stage(output_dir, staging):
+    '''Make staging the same as output_dir, with hardlinks, to build in. After
+    a build, the tree that was replaced is kept as the staging directory by
+    retire(), so then only what changed in the last build has to be linked
+    again, which is worked out from the deploy manifests of both.
+    '''
+    try:
+        behind = (staging / staging_marker).read_text()
+        current = behind == hash_file(output_dir / deploy_filename)
+    except OSError:
+        current = False
+    if current:
+        (staging / staging_marker).unlink()
+        new = DeployManifest.load(output_dir)
+        old = DeployManifest.load(staging)
+        relink_paths(output_dir, staging, sorted(
+            [
+                rel for rel, stat in new.stats.items()
+                if old.stats.get(rel) != stat or
+                    old.files.get(rel) != new.files[rel]
+            ] +
+            [rel for rel in old.files if rel not in new.files] +
+            list(build_files)
+        ))
+        return
+    if staging.is_dir():
+        # Left over from a build that failed or an older output directory
+        rmtree(str(staging))
+    if output_dir.is_dir():
+        link_tree(output_dir, staging)
+    else:
+        staging.mkdir(parents=True)
+
+def retire(staging, output_dir):
+    '''Replace output_dir with what was built in staging, keeping what was
+    there as the staging directory of the next build, see stage().
+    '''
+    if swap_dirs(staging, output_dir, keep=True):
+        write_file(staging / staging_marker,
+            hash_file(output_dir / deploy_filename).encode('utf-8')
+        )
+
+# State of a worker process used for --jobs
+# Globals generate() sets that workers need
+build_globals = ('srcset', 'asset')
+
+worker_env = None
+
+def init_worker(input_dir, state):
+    global worker_env
+    site = Site(input_dir)
+    site.posts, site.tags, globals = pickle.loads(state)
+    site.loaded = True
+    worker_env = setup_jinja(site)
+    worker_env.globals.update(globals)
+    for post in site.posts.values():
+        post.render_content(worker_env)
+
+def render_in_worker(page):
+    return render_output(worker_env, *page)
+
+def generate(
+    input_dir, output_dir, incremental=False, jobs=1, env=None, stats=False,
+    shard=None, check_links=False
+):
     '''Using everything, generates the blog from page, templates, static and
     media files and the posts. Removes the output directory if it currently
-    exists.
+    exists, unless incremental is True, in which case only the outputs whose
+    inputs, templates or relevant globals changed since the last build are
+    written and outputs that no longer exist are removed. If jobs is more than
+    1, pages are rendered by that many worker processes. An environment from
+    setup_jinja() can be passed to reuse it, its Site and its compiled
+    templates. If stats is True, how well the caches did is printed at the
+    end.
+
+    The site is built in a staging directory next to output_dir that starts
+    as a hardlinked copy of it and replaces it at the end, so output_dir is
+    never half built. What it replaced is kept as the next staging
+    directory, see stage(). Files whose contents didn't change aren't
+    written, so they keep their mtime. The hash of every output file is
+    saved in .stablogen_deploy.json and the paths that were added, changed
+    and removed since the last build are saved in
+    .stablogen_deploy_diff.json.
+
+    If shard is (i, N), only the outputs that are in shard i of N are built,
+    see shard.py, and the shard is recorded so merge() can put the shards
+    back together. Everything is still loaded, so globals are the same in
+    every shard.
+
+    If output_dir is the path of an archive, like site.tar.gz or site.zip,
+    the site is written to it instead of a directory, see ArchiveOutput.
+    Everything is built, but input hashes are still reused.
+
+    If check_links is True, the links in every page are checked against the
+    outputs of the build, without reading the pages back unless they weren't
+    built this time and weren't checked last time, and a LinkReport is
+    printed and returned. Pages that no other page links to are only
+    reported if the whole site is built, not a shard of it.
     '''
-    Post.load_all(input_dir)
+    site = Site(input_dir) if env is None else env.site
+    with timing.span('phase', 'load'):
+        site.load()
+    config = load_config(input_dir) if env is None else env.globals['config']
     input_posts_dir = input_dir / posts_dirname
     templates_dir = input_dir / templates_dirname
 
-    # Remove output directory if it exists
-    if output_dir.is_dir():
-        rmtree(str(output_dir))
-    output_dir.mkdir()
+    archive = archive_format(output_dir) is not None
+    if archive:
+        if shard is not None:
+            raise ValueError('Archives can\'t be built in shards')
+        # There's nothing to build in, output_dir is only used to make the
+        # paths of outputs. Input hashes are kept in the cache directory.
+        manifest_dir = input_dir / cache_dirname
+        manifest = Manifest.load(manifest_dir)
+        manifest.old_outputs = {}
+        output = ArchiveOutput(output_dir)
+    else:
+        # Build in the staging directory, starting from what's there now so
+        # unchanged files can be left alone.
+        final_output_dir = output_dir
+        output_dir = manifest_dir = staging_dir(final_output_dir)
+        with timing.span('phase', 'stage'):
+            stage(final_output_dir, output_dir)
+        # Even for a full build, reuse the input hashes from the last build
+        manifest = Manifest.load(output_dir)
+        old_deploy = DeployManifest.load(output_dir)
+        output = DirectoryOutput(output_dir, config['copy_mode'])
+    if not incremental and not archive:
+        # Everything is built again, but only written if it changed.
+        # Whatever is there that isn't built is removed.
+        previous_outputs = manifest.old_outputs
+        manifest.old_outputs = dict.fromkeys(
+            list_files(output_dir, build_files)
+        )
+        # Compressed outputs only depend on the files they were made from,
+        # which keep their mtime if they weren't changed, so they're kept.
+        for rel in manifest.old_outputs:
+            if rel.endswith(compressed_suffixes()) and rel in previous_outputs:
+                manifest.old_outputs[rel] = previous_outputs[rel]
 
-    # Copy eveything in input to output as long as it's not to be
-    # rendered or special
+    # Posts are in the keys of many outputs, so their hashes are kept
+    post_hashes = {}
 
-    def is_hidden(p):
-        return re.match(r'^\..*$', p.name)
+    def post_hash(post):
+        digest = post_hashes.get(post.source)
+        if digest is None:
+            digest = post_hashes[post.source] = \
+                manifest.input_hash(input_dir, post.source)
+        return digest
 
-    def will_copy(p):
-        return not any([
-            p == input_posts_dir, # Will be generating posts later
-            p == templates_dir, # Don't need to do anything else with
-            is_hidden(p), # don't copy hidden things
-            p.name == config_filename, # Don't copy config file
-        ])
+    # Every output of the whole site, for merging shards
+    planned = []
 
-    dirs = []
-    files = []
+    def needs_build(rel, *parts):
+        '''Like Manifest.needs_build(), but only outputs in the shard are
+        built.
+        '''
+        rel = str(rel)
+        planned.append(rel)
+        return in_shard(rel, shard) and \
+            manifest.needs_build(output_dir, rel, *parts)
 
-    # Get root directories and files we want to work with:
-    for p in input_dir.glob('*'):
-        if will_copy(p):
-            (dirs if p.is_dir() else files).append(p)
+    copy_phase = timing.span('phase', 'copy')
 
-    # Work recursively on choosen subdirectores (not hidden)
-    for d in dirs:
-        for p in d.glob('**/*'):
-            if not is_hidden(p):
-                (dirs if p.is_dir() else files).append(p)
+    # Copy eveything in input to output as long as it's not to be
+    # rendered or special. Hidden things are skipped by scan_tree.
+    dirs, files = scan_tree(input_dir, skip = [
+        input_posts_dir, # Will be generating posts later
+        templates_dir, # Don't need to do anything else with
+        input_dir / config_filename, # Don't copy config file
+    ])
 
     # Make Output Directories
     for p in dirs:
-        (output_dir / p.relative_to(input_dir)).mkdir(
-            parents=True,
-            exist_ok=True
-        )
+        output.mkdir(p.relative_to(input_dir))
 
     process_html = []
+    minify_stats = MinifyStats()
+    image_types = tuple(config['image_types']) if config['images'] else ()
+    image_files = []
+    fingerprint_types = tuple(config['fingerprint_types']) \
+        if config['fingerprint'] else ()
+    assets = {}
 
     # Handle Files
-    for p in files:
+    for p, st in files:
         if p.suffix in RENDER_EXTENTIONS:
             process_html.append(p.relative_to(input_dir))
-        elif p.is_file():
-            copyfile(str(p), str(output_dir / p.relative_to(input_dir)))
+        elif p.suffix == '.css' and config['minify'] and st is not None:
+            rel = p.relative_to(input_dir)
+            minified = None
+            if needs_build(rel, 'minify', st.st_size, st.st_mtime_ns):
+                minified = minify_stats.minify(
+                    'css', p.read_text(encoding='utf-8')
+                ).encode('utf-8')
+                output.write(rel, minified)
+            if p.suffix.lower() in fingerprint_types:
+                # The hash of the minified CSS is only worked out again
+                # if the input changed.
+                digest = manifest.memo('asset ' + str(rel),
+                    manifest.input_hash(input_dir, p),
+                    lambda: hash_text(minify_css(
+                        p.read_text(encoding='utf-8')
+                    ))
+                )
+                assets[str(rel)] = fingerprinted_path(rel, digest)
+                if needs_build(assets[str(rel)], 'minify', digest):
+                    output.write(assets[str(rel)], minified or minify_css(
+                        p.read_text(encoding='utf-8')
+                    ).encode('utf-8'))
+        elif st is not None:
+            rel = p.relative_to(input_dir)
+            if p.suffix.lower() in image_types:
+                image_files.append((str(rel), p))
+            # The size and mtime are enough to tell if the file changed,
+            # the contents are checked if the output is there.
+            if needs_build(rel, 'copy', st.st_size, st.st_mtime_ns):
+                output.copy(p, rel, st)
+            if p.suffix.lower() in fingerprint_types:
+                # Only hashed if the size or mtime changed
+                digest = manifest.input_hash(input_dir, p)
+                assets[str(rel)] = fingerprinted_path(rel, digest)
+                if needs_build(assets[str(rel)], 'copy', digest):
+                    output.copy(p, assets[str(rel)], st)
         else:
-            print('Input item "{}" was ignored').format(str(p))
+            print('Input item "{}" was ignored'.format(str(p)))
+    copy_phase.end()
+
+    with timing.span('phase', 'jinja setup'):
+        if env is None:
+            env = setup_jinja(site)
+        else:
+            update_globals(env)
+    deps = TemplateDeps(env)
+
+    if image_files:
+        with timing.span('phase', 'images'):
+            env.globals['srcset'] = build_images(
+                image_files, output, input_dir / cache_dirname / 'images',
+                config['images'], config['image_quality'],
+                lambda path: manifest.input_hash(input_dir, path),
+                needs_build,
+            )
+    else:
+        env.globals['srcset'] = ImageSet()
 
-    env = setup_jinja(input_dir)
+    # Codehighlighting css, fingerprinted like the other assets
+    code_css = code_style()
+    if config['minify']:
+        code_css = minify_css(code_css)
+    code_css_digest = hash_text(code_css)
+    if PYGMENTS_CSS_OUTPUT.endswith(fingerprint_types):
+        assets[PYGMENTS_CSS_OUTPUT] = fingerprinted_path(
+            PYGMENTS_CSS_OUTPUT, code_css_digest
+        )
+    env.globals['asset'] = AssetMap(assets)
+
+    # Code blocks in templates and posts are highlighted differently if
+    # Pygments or the code style change
+    highlight_key = pygments.__version__ + style_key()
+
+    def key(name, direct=None):
+        '''Templates and globals that the template name depends on, see
+        TemplateDeps.closure().
+        '''
+        templates, variables = deps.closure(name, direct)
+        # Hashed here, since listings of every post can be in it and it's
+        # part of the key of many outputs
+        return hash_text(highlight_key + repr(templates) + ''.join(
+            var + '=' + fingerprint(env.globals[var], post_hash)
+            for var in sorted(variables) if var in env.globals
+        ))
+
+    # Work out what pages have to be rendered. Each is (output path, kind,
+    # name), see render().
+    plan_phase = timing.span('phase', 'plan')
+    pages = []
+    # Every page of the site, for checking links
+    page_rels = []
 
-    # Render Post content
-    for post in Post.inventory.values():
-        post.content = env.from_string(post.content).render()
+    def plan_page(rel, kind, name, *parts):
+        page_rels.append(str(rel))
+        if needs_build(rel, kind, *parts):
+            pages.append((rel, kind, name))
 
-    # Render Regular Pages
+    # Regular Pages
     for i in process_html:
         if i.name == 'index.html':
             page_dir = output_dir / i.parent
         else:
             page_dir = output_dir / i.parent / i.stem
 
-        page_dir.mkdir(parents = True, exist_ok = True)
-        (page_dir / 'index.html').write_text(env.get_template(str(i)).render())
+        rel = page_dir.relative_to(output_dir) / 'index.html'
+        plan_page(rel, 'page', str(i), key(str(i)), config['minify'])
 
-    # Render Actual Post Pages
+    # Actual Post Pages
     posts_output_dir = output_dir / posts_dirname
-    posts_output_dir.mkdir()
-
-    for url, post in Post.inventory.items():
+    post_template_key = key('post.html')
+    # What the rendered content of each post is made from
+    content_keys = {}
+    for url, post in site.posts.items():
         post_dir = posts_output_dir / url
-        post_dir.mkdir()
-        post_file = post_dir / 'index.html'
-        with post_file.open('w') as f:
-            f.write(env.get_template('post.html').render(post=post))
-
-    # Render Posts Index
-    with (posts_output_dir / 'index.html').open('w') as f:
-        f.write(env.get_template('list_posts.html').render())
-
-    # Render Tags
-    tags_output_dir = output_dir / tags_dirname
-    tags_output_dir.mkdir()
-
-    for tag in Tag.inventory.values():
-        tag_dir = tags_output_dir / tag.url
-        tag_dir.mkdir()
-        tag_file = tag_dir / 'index.html'
-        with tag_file.open('w') as f:
-            f.write(env.get_template('tag.html').render(tag=tag))
-
-    # Render Tags Index
-    with (tags_output_dir / 'index.html').open('w') as f:
-        f.write(env.get_template('list_tags.html').render(
-            tags=Tag.get_most_tagged(input_dir)
+        # Post content is rendered too, so it's a template as well. What it
+        # uses is remembered so the content doesn't have to be read.
+        content_keys[url] = post_hash(post) + key(url, manifest.memo(
+            'post ' + url, post_hash(post),
+            lambda: deps.references(post.raw_content)
         ))
+        rel = post_dir.relative_to(output_dir) / 'index.html'
+        plan_page(
+            rel, 'post', url, post_template_key, config['minify'],
+            content_keys[url]
+        )
+
+    per_page = env.globals['config']['posts_per_page']
+
+    # Posts Index, the first page is posts/index.html, the rest are
+    # posts/N/index.html
+    list_posts_key = key('list_posts.html')
+    for page in Page(env.globals['latest_posts'], per_page).pages():
+        rel = Path(page.url(posts_dirname)) / 'index.html'
+        plan_page(
+            rel, 'list_posts', page.index, list_posts_key, per_page,
+            page.index, config['minify']
+        )
+
+    # Tags
+    tag_template_key = key('tag.html')
+    for tag in site.tags.values():
+        tag_key = hash_text(fingerprint(tag.posts, post_hash))
+        for page in Page(tag.posts, per_page).pages():
+            rel = Path(page.url(tags_dirname + '/' + tag.url)) / 'index.html'
+            plan_page(
+                rel, 'tag', (tag.name, page.index), tag.name, tag_key,
+                tag_template_key, per_page, page.index, config['minify']
+            )
+
+    # Tags Index
+    rel = Path(tags_dirname) / 'index.html'
+    plan_page(
+        rel, 'list_tags', None, key('list_tags.html'), config['minify'], repr([
+            (t.name, t.url, len(t.posts))
+            for t in site.get_most_tagged()
+        ])
+    )
+    plan_phase.end()
+
+    # Search index of the finalized posts, posts are only tokenized again if
+    # their content changed.
+    tokenized = set()
+    if config['search']:
+        with timing.span('phase', 'search index'):
+            search = SearchIndex(
+                input_dir / cache_dirname / 'search.pickle',
+                config['search_prefix_length'],
+            )
+            for post in env.globals['latest_posts']:
+                post.render_content(env)
+            for post in search.update(
+                env.globals['latest_posts'],
+                lambda post: hash_text(content_keys[post.url]),
+            ):
+                tokenized.add(post.url)
+            for rel, data in sorted(search.files().items()):
+                if needs_build(rel, 'search', hash_text(data)):
+                    output.write(rel, data)
+            search.save()
+
+    # Render them, finding the links in them as they're written
+    links = {}
+    if jobs > 1 and len(pages) > 1:
+        # Workers get their own copy of the posts and tags, pickled once
+        # here.
+        state = pickle.dumps((site.posts, site.tags, dict(
+            (name, env.globals[name]) for name in build_globals
+        )))
+        with process_pool(
+            max_workers = jobs,
+            initializer = init_worker,
+            initargs = (input_dir, state),
+        ) as pool, timing.span('phase', 'render ({} processes)'.format(jobs)):
+            rendered = pool.map(
+                render_in_worker,
+                [(kind, name, check_links) for path, kind, name in pages],
+                chunksize = max(1, len(pages) // (jobs * 4)),
+            )
+            write_pages(output, pages, rendered, minify_stats, links)
+    else:
+        # Post content is rendered by Jinja when it's first used, the posts
+        # that were tokenized for the search index already have it.
+        for post in site.posts.values():
+            if post.url not in tokenized:
+                post.render_content(env)
+        for kind, group in itertools.groupby(pages, key=lambda p: p[1]):
+            group = list(group)
+            with timing.span('phase', page_phases[kind]):
+                write_pages(output, group, (
+                    render_output(env, kind, name, check_links)
+                    for path, kind, name in group
+                ), minify_stats, links)
 
     # Codehighlighting css
-    output_code_style(output_dir / PYGMENTS_CSS_OUTPUT)
+    with timing.span('phase', 'code css'):
+        paths = [PYGMENTS_CSS_OUTPUT]
+        if PYGMENTS_CSS_OUTPUT in assets:
+            paths.append(assets[PYGMENTS_CSS_OUTPUT])
+        for rel in paths:
+            if needs_build(rel, 'code_css', code_css_digest):
+                if config['minify'] and rel == PYGMENTS_CSS_OUTPUT:
+                    minify_stats.add('css',
+                        len(code_style().encode('utf-8')),
+                        len(code_css.encode('utf-8'))
+                    )
+                output.write(rel, code_css.encode('utf-8'))
+
+        # What assets were fingerprinted as, for servers and scripts
+        if config['fingerprint']:
+            data = env.globals['asset'].manifest()
+            if needs_build(asset_manifest_filename, 'assets', hash_text(data)):
+                output.write(asset_manifest_filename, data)
+
+    report = None
+    if check_links:
+        with timing.span('phase', 'check links'):
+            page_links = {}
+            for rel in page_rels:
+                if not in_shard(rel, shard):
+                    continue
+                # The links in pages that weren't built are what they were
+                # when they were. They're kept as one string, which is a lot
+                # quicker to save than a list.
+                found = manifest.memo(
+                    'links ' + rel, manifest.outputs[rel],
+                    lambda: '\n'.join(links[rel] if rel in links else
+                        find_links(
+                            (output_dir / rel).read_text(encoding='utf-8')
+                        )
+                    )
+                )
+                page_links[rel] = found.split('\n') if found else []
+            report = LinkReport(planned, page_links, orphans=shard is None)
+
+    # Copies that are still going, which is part of copying
+    with timing.span('phase', 'copy'):
+        output.flush()
+
+    # Compressed copies of the outputs
+    if config['compress']:
+        with timing.span('phase', 'compress'), \
+                Compressor(config['compress'], config['compress_level']) \
+                as compressor:
+            compress_types = tuple(config['compress_types'])
+            for rel in list(manifest.outputs):
+                if not rel.endswith(compress_types):
+                    continue
+                if archive:
+                    if output.size(rel) >= config['compress_min_size']:
+                        compressor.compress_output(output, rel)
+                    continue
+                path = output_dir / rel
+                st = path.stat()
+                if st.st_size < config['compress_min_size']:
+                    continue
+                # Outputs are only written if they changed, so the mtime is
+                # enough to tell if they did.
+                if any([
+                    manifest.needs_build(
+                        output_dir, rel + codecs[name][0], 'compress', name,
+                        compressor.level, st.st_size, st.st_mtime_ns
+                    ) for name in compressor.names
+                ]):
+                    compressor.compress(path)
+
+    if archive:
+        with timing.span('phase', 'archive'):
+            output.close()
+        # Only the input hashes and memos are any use next time
+        manifest.outputs = {}
+        manifest.save(manifest_dir)
+    else:
+        output.close()
+        # Remove what was built last time but wasn't this time, like the
+        # directories of deleted posts and tags.
+        manifest.remove_stale(output_dir)
+        manifest.save(output_dir)
+        if shard is None:
+            if (output_dir / shard_filename).exists():
+                (output_dir / shard_filename).unlink()
+        else:
+            save_shard(output_dir, shard, planned, manifest.outputs)
+
+        with timing.span('phase', 'deploy manifest'):
+            deploy = DeployManifest.scan(output_dir, old_deploy, build_files)
+            deploy.save(output_dir, old_deploy)
+        with timing.span('phase', 'swap'):
+            retire(output_dir, final_output_dir)
+    env.code_cache.prune()
+
+    for line in minify_stats.lines():
+        print(line)
+
+    if report is not None:
+        for line in report.lines():
+            print(line)
+
+    if stats:
+        if jobs > 1:
+            print('Cache stats (main process only):')
+        for line in cache_stats(env):
+            print(line)
+
+    return report
+
+def merge(shard_dirs, output_dir):
+    '''Put the output directories of all the shards of a build together in
+    output_dir, the same way generate() builds it. Returns a list of problems
+    with the shards, like missing or duplicated outputs, in which case
+    nothing is done.
+    '''
+    problems, files = check_shards(shard_dirs)
+    if problems:
+        return problems
+
+    final_output_dir = output_dir
+    output_dir = staging_dir(final_output_dir)
+    if output_dir.is_dir():
+        rmtree(str(output_dir))
+    output_dir.mkdir(parents=True)
+    old_deploy = DeployManifest.load(final_output_dir)
+
+    # Every shard has all the directories, even if they're empty
+    for d in shard_dirs:
+        dirs, ignored = scan_tree(d)
+        for p in dirs:
+            (output_dir / p.relative_to(d)).mkdir(parents=True, exist_ok=True)
+    for rel, d in sorted(files.items()):
+        src = d / rel
+        copy_file(src, output_dir / rel, src.stat(), 'hardlink')
+
+    deploy = DeployManifest.scan(output_dir, old_deploy, build_files)
+    deploy.save(output_dir, old_deploy)
+    swap_dirs(output_dir, final_output_dir)
+    return []
+
+def generate_batch(sites, incremental=False, jobs=1, threads=4):
+    '''Generate more than one site in this process, sites being a list of
+    (input_dir, output_dir), using up to threads threads at once. The sites
+    share what's cached in the process, like compiled templates, the Pygments
+    lexers and formatters, so only the first site pays for them. Returns a
+    list of (input_dir, exception) of the sites that failed to build.
+
+    If jobs is more than 1, each site already renders on that many
+    processes, so the sites are built one at a time.
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    if jobs > 1:
+        threads = 1
+
+    def build(site):
+        input_dir, output_dir = site
+        try:
+            generate(input_dir, output_dir, incremental, jobs)
+        except Exception as e:
+            return input_dir, e
+        return None
 
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+        return [failed for failed in pool.map(build, sites) if failed]
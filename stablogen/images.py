@@ -0,0 +1,156 @@
+# Smaller copies of images for responsive pages, see make_derivatives() and
+# ImageSet. Uses Pillow if it's installed, otherwise images are just copied.
+
+# Python Standard Library
+import os
+import tempfile
+from pathlib import PurePosixPath
+
+try:
+    from PIL import Image, ImageOps
+    # What Pillow raises for files it can't read, UnidentifiedImageError is
+    # an OSError, but older versions don't have it.
+    image_errors = (getattr(Image, 'UnidentifiedImageError', OSError), OSError)
+except ImportError:
+    Image = None
+
+# Bump this when derivatives are made differently
+image_cache_version = 1
+
+def derivative_path(rel, width):
+    '''Where the derivative of the image at rel that is width pixels wide
+    goes, like static/photo-480w.jpg for static/photo.jpg.
+    '''
+    p = PurePosixPath(rel)
+    return str(p.with_name('{}-{}w{}'.format(p.stem, width, p.suffix)))
+
+def cache_path(cache_dir, digest, width, quality, suffix):
+    return cache_dir / '{}-{}w-q{}-v{}{}'.format(
+        digest, width, quality, image_cache_version, suffix
+    )
+
+def make_derivatives(path, cache_dir, digest, widths, quality):
+    '''Make the derivatives of the image at path that are narrower than it in
+    cache_dir, keeping the format. Returns the (width, height) of the image.
+    Runs in worker processes.
+    '''
+    with Image.open(str(path)) as image:
+        image = ImageOps.exif_transpose(image)
+        size = image.size
+        for width in widths:
+            if width >= size[0]:
+                continue
+            dst = cache_path(cache_dir, digest, width, quality, path.suffix)
+            if dst.exists():
+                continue
+            height = max(1, round(size[1] * width / size[0]))
+            resized = image.resize((width, height), Image.LANCZOS)
+            fmt = Image.registered_extensions().get(path.suffix.lower())
+            if fmt == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                resized = resized.convert('RGB')
+            fd, tmp = tempfile.mkstemp(dir=str(cache_dir), prefix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    resized.save(f, fmt, quality=quality, optimize=True)
+                os.replace(tmp, str(dst))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+    return size
+
+class ImageSet:
+    '''The derivatives of the images in the output, used by templates as
+    srcset(src) to get the value of the srcset attribute of an img tag:
+
+        <img src="/static/photo.jpg" srcset="{{ srcset('/static/photo.jpg') }}"
+            sizes="100vw">
+
+    images maps the paths of images relative to the output directory to
+    (width, [(derivative width, derivative path), ...]). Images that don't
+    have derivatives just get their own URL.
+    '''
+
+    def __init__(self, images=None):
+        self.images = {} if images is None else images
+
+    def __call__(self, src):
+        image = self.images.get(src.lstrip('/'))
+        if image is None:
+            return src
+        prefix = '/' if src.startswith('/') else ''
+        width, derivatives = image
+        return ', '.join(
+            '{}{} {}w'.format(prefix, path, w) for w, path in derivatives
+        ) + ', {} {}w'.format(src, width)
+
+    # Used as the fingerprint of the global, see generate.fingerprint()
+    def __repr__(self):
+        return 'ImageSet({!r})'.format(sorted(self.images.items()))
+
+def build_images(files, output, cache_dir, widths, quality, file_hash,
+    needs_build
+):
+    '''Put the derivatives of the images in files, a list of (path relative
+    to the output directory, input path), in output, a DirectoryOutput or an
+    ArchiveOutput, and return an ImageSet of them. Derivatives are made on a
+    process pool and kept in cache_dir by the hash of the image,
+    file_hash(path), so they are only made once. needs_build(rel, *parts) is
+    like Manifest.needs_build().
+    '''
+    # Only imported if there are images
+    from stablogen.cache import load_pickle, save_pickle
+    from stablogen.util import process_pool
+
+    if Image is None:
+        print('Pillow is not installed, images are copied as they are')
+        return ImageSet()
+    widths = sorted(set(widths))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sizes_path = cache_dir / 'sizes.pickle'
+    # Maps hashes to the size of the image, or why it couldn't be read, so
+    # it isn't tried again until it changes
+    sizes = load_pickle(sizes_path, image_cache_version) or {}
+
+    digests = [(rel, path, file_hash(path)) for rel, path in files]
+    todo = []
+    for rel, path, digest in digests:
+        size = sizes.get(digest)
+        if size is None or not isinstance(size, str) and not all(
+            cache_path(cache_dir, digest, w, quality, path.suffix).exists()
+            for w in widths if w < size[0]
+        ):
+            todo.append((path, digest))
+    if todo:
+        with process_pool() as pool:
+            futures = [
+                (digest, pool.submit(make_derivatives,
+                    path, cache_dir, digest, widths, quality
+                )) for path, digest in todo
+            ]
+            for digest, future in futures:
+                try:
+                    sizes[digest] = future.result()
+                except image_errors as e:
+                    sizes[digest] = str(e) or type(e).__name__
+        save_pickle(sizes_path, image_cache_version, sizes)
+
+    images = {}
+    for rel, path, digest in digests:
+        if isinstance(sizes[digest], str):
+            # It's still copied, just without a srcset
+            print('Warning: Could not read image "{}": {}'.format(
+                rel, sizes[digest]
+            ))
+            continue
+        width = sizes[digest][0]
+        derivatives = []
+        for w in widths:
+            if w >= width:
+                continue
+            out = derivative_path(rel, w)
+            derivatives.append((w, out))
+            if needs_build(out, 'image', digest, w, quality):
+                src = cache_path(cache_dir, digest, w, quality, path.suffix)
+                output.copy(src, out, src.stat())
+        images[rel] = (width, derivatives)
+    return ImageSet(images)
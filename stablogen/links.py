@@ -0,0 +1,107 @@
+# Checks the links between the pages of a site against what the build made,
+# see find_links() and LinkReport.
+
+# Python Standard Library
+import re
+import html
+from urllib.parse import urljoin, urlsplit, unquote
+
+# Case sensitive, since that lets re skip to where href and src are, which
+# makes this a few times faster.
+link_re = re.compile(
+    r'''(?:href|src)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))'''
+)
+
+def find_links(text):
+    '''Return a sorted list of the links to other parts of the site in the
+    href and src attributes of the HTML text, as they are written. The
+    attributes have to be in lowercase, like the templates have them.
+    '''
+    links = set()
+    for groups in link_re.findall(text):
+        link = groups[0] or groups[1] or groups[2]
+        if '&' in link:
+            link = html.unescape(link)
+        if '\n' in link or '\t' in link:
+            # Browsers drop them
+            link = link.replace('\n', '').replace('\t', '')
+        links.add(link.strip())
+    return sorted(
+        link for link in links
+        # Not other sites, things like mailto: or the same page
+        if link and link[0] != '#' and not link.startswith('//') and
+            (':' not in link or not urlsplit(link).scheme)
+    )
+
+def page_url(rel):
+    '''URL of the output rel, like /posts/a/ for posts/a/index.html.
+    '''
+    if rel == 'index.html':
+        return '/'
+    if rel.endswith('/index.html'):
+        return '/' + rel[:-len('index.html')]
+    return '/' + rel
+
+def resolve(link, base, routes):
+    '''Return the output in routes, a set of paths relative to the output
+    directory, that link on the page at the URL base goes to or None. Like
+    a web server, a directory is its index.html.
+    '''
+    path = unquote(urlsplit(urljoin(base, link)).path).lstrip('/')
+    if path == '' or path.endswith('/'):
+        candidates = [path + 'index.html']
+    else:
+        candidates = [path, path + '/index.html']
+    for rel in candidates:
+        if rel in routes:
+            return rel
+    return None
+
+class LinkReport:
+    '''Links in pages to what isn't in the site and, if orphans is True,
+    pages that no other page links to.
+
+    routes is every output of the build and pages maps the outputs that are
+    pages to the links in them, from find_links().
+    '''
+
+    def __init__(self, routes, pages, orphans=True):
+        routes = set(routes)
+        # (page, link)
+        self.dangling = []
+        linked = set()
+        # Links that start with / are the same on every page
+        resolved = {}
+        for rel, links in sorted(pages.items()):
+            base = page_url(rel)
+            for link in links:
+                cache_key = link if link[0] == '/' else (base, link)
+                target = resolved.get(cache_key, False)
+                if target is False:
+                    target = resolved[cache_key] = resolve(link, base, routes)
+                if target is None:
+                    self.dangling.append((rel, link))
+                elif target != rel:
+                    linked.add(target)
+        self.orphans = sorted(
+            rel for rel in pages if rel not in linked and rel != 'index.html'
+        ) if orphans else []
+
+    def lines(self):
+        # Links in templates are in every page, so pages are grouped by link
+        by_link = {}
+        for rel, link in self.dangling:
+            by_link.setdefault(link, []).append(rel)
+        return [
+            'Dangling link {} in {}'.format(link, rels[0]) if len(rels) == 1
+            else 'Dangling link {} in {} pages, like {}'.format(
+                link, len(rels), rels[0]
+            )
+            for link, rels in sorted(by_link.items())
+        ] + [
+            'Orphaned page: {}'.format(rel) for rel in self.orphans
+        ] + [
+            'Links: {} dangling, {} orphaned pages'.format(
+                len(self.dangling), len(self.orphans)
+            )
+        ]
@@ -0,0 +1,112 @@
+# Optional minification of HTML and CSS outputs, enabled with the minify
+# setting. Only changes that don't change how pages look are made.
+
+# Python Standard Library
+import re
+from collections import OrderedDict
+
+# Elements whose contents are left alone. Whitespace matters in pre and
+# textarea and script and style aren't HTML.
+html_keep_re = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I
+)
+
+# Comments, except conditional comments that old IE reads
+html_comment_re = re.compile(r'<!--(?!\[if).*?-->', re.S)
+
+html_space_re = re.compile(r'\s+')
+
+# Tags of elements that aren't displayed or are around everything that is, so
+# the whitespace around them never shows. Any other element can be made inline
+# by CSS, like the lists of tags are, so the whitespace between them is only
+# collapsed.
+html_hidden_tags = 'html|head|body|title|meta|link|base|!doctype'
+html_hidden_space_re = re.compile(
+    r'\s*(</?(?:' + html_hidden_tags + r')\b[^>]*>)\s*', re.I
+)
+
+def collapse_space(match):
+    # Keep newlines so lines don't get too long, they take the same space
+    return '\n' if '\n' in match.group(0) else ' '
+
+def minify_html_part(text):
+    text = html_comment_re.sub('', text)
+    text = html_space_re.sub(collapse_space, text)
+    return html_hidden_space_re.sub(r'\1', text)
+
+def minify_html(text):
+    '''Remove comments and whitespace that doesn't change how the page looks
+    from HTML, except in pre, textarea, script and style elements.
+    '''
+    parts = html_keep_re.split(text)
+    result = []
+    # split() gives [text, kept, tag name, text, kept, tag name, ..., text]
+    for i in range(0, len(parts), 3):
+        result.append(minify_html_part(parts[i]))
+        if i + 1 < len(parts):
+            result.append(parts[i + 1])
+    return ''.join(result)
+
+# Strings are kept as they are
+css_token_re = re.compile(
+    r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''', re.S
+)
+css_comment_re = re.compile(r'/\*.*?\*/', re.S)
+css_space_re = re.compile(r'\s+')
+# Space before ":" is kept since "a :hover" isn't the same as "a:hover"
+css_punctuation_re = re.compile(r'\s*([{};,>])\s*|:\s+')
+
+def minify_css_part(text):
+    text = css_space_re.sub(' ', text)
+    return css_punctuation_re.sub(
+        lambda m: m.group(1) if m.group(1) else ':', text
+    ).replace(';}', '}')
+
+def minify_css(text):
+    '''Remove comments, whitespace and semicolons that aren't needed from
+    CSS.
+    '''
+    text = css_comment_re.sub('', text)
+    parts = css_token_re.split(text)
+    # Odd parts are strings
+    text = ''.join(
+        part if i % 2 else minify_css_part(part)
+        for i, part in enumerate(parts)
+    )
+    return text.strip()
+
+# Functions to minify each type of file
+minifiers = dict(
+    html = minify_html,
+    css = minify_css,
+)
+
+class MinifyStats:
+    '''Bytes saved by minifying each type of file.
+    '''
+
+    def __init__(self):
+        self.types = OrderedDict()
+
+    def add(self, kind, before, after):
+        files, total_before, total_after = self.types.get(kind, (0, 0, 0))
+        self.types[kind] = (
+            files + 1, total_before + before, total_after + after
+        )
+
+    def minify(self, kind, text):
+        '''Minify text, kind being "html" or "css", and count it.
+        '''
+        result = minifiers[kind](text)
+        self.add(kind, len(text.encode('utf-8')), len(result.encode('utf-8')))
+        return result
+
+    def lines(self):
+        return [
+            'Minified {}: {} files, {} bytes to {} bytes, saved {} ({:.1%})'
+            .format(
+                kind, files, before, after, before - after,
+                (before - after) / before if before else 0
+            )
+            for kind, (files, before, after) in self.types.items()
+        ]
@@ -0,0 +1,138 @@
+# Client side search index of the finalized posts, see SearchIndex.
+
+# Python Standard Library
+import re
+import json
+import html
+from collections import Counter
+
+# Local
+from stablogen.cache import load_pickle, save_pickle
+
+search_dirname = 'search'
+search_cache_version = 1
+
+# How much a term counts for in each part of a post
+title_weight = 5
+tag_weight = 5
+content_weight = 1
+
+# What isn't text
+script_re = re.compile(r'<(script|style)\b.*?</\1\s*>', re.S | re.I)
+html_tag_re = re.compile(r'<[^>]*>')
+word_re = re.compile(r'\w+')
+
+def strip_html(text):
+    '''Return the text in HTML, without tags, scripts or styles.
+    '''
+    text = script_re.sub(' ', text)
+    return html.unescape(html_tag_re.sub(' ', text))
+
+def tokenize(text):
+    '''Lowercase words of at least 2 characters in text.
+    '''
+    return [w for w in word_re.findall(text.lower()) if len(w) > 1]
+
+def post_terms(post):
+    '''Return {term: score} for a post, using its rendered content.
+    '''
+    counts = Counter()
+    for text, weight in (
+        (post.title, title_weight),
+        (' '.join(post.tags), tag_weight),
+        (strip_html(post.content), content_weight),
+    ):
+        for term in tokenize(text):
+            counts[term] += weight
+    return dict(counts)
+
+class SearchIndex:
+    '''Inverted index of posts split into JSON files by the first
+    prefix_length characters of the terms, so a browser only has to download
+    the files of the terms it's looking for.
+
+    search/docs.json has {"prefix_length": N, "docs": {id: [url, title]}}
+    and search/terms/PREFIX.json has {term: [[id, score], ...]} with the
+    highest scores first. IDs stay the same between builds, so adding a post
+    only changes the files of its terms.
+
+    The terms of each post are cached in path by a key of what its content
+    was rendered from, so only posts that changed are tokenized again.
+    '''
+
+    def __init__(self, path, prefix_length=2):
+        self.path = path
+        self.prefix_length = prefix_length
+        data = load_pickle(path, search_cache_version)
+        if data is None:
+            data = dict(ids={}, next_id=0, posts={})
+        self.ids = data['ids']
+        self.next_id = data['next_id']
+        # url: (key, title, terms)
+        self.old_posts = data['posts']
+        self.posts = {}
+
+    def needs_update(self, post, key):
+        old = self.old_posts.get(post.url)
+        return old is None or old[0] != key
+
+    def update(self, posts, key):
+        '''Use posts, a list of Posts, as what's indexed, key(post) being a
+        string that changes when the post's content does. Returns the posts
+        that had to be tokenized.
+        '''
+        tokenized = []
+        for post in posts:
+            k = key(post)
+            if self.needs_update(post, k):
+                self.posts[post.url] = (k, post.title, post_terms(post))
+                tokenized.append(post)
+            else:
+                self.posts[post.url] = self.old_posts[post.url]
+            if post.url not in self.ids:
+                self.ids[post.url] = self.next_id
+                self.next_id += 1
+        # Posts that aren't there anymore don't keep their IDs
+        for url in list(self.ids):
+            if url not in self.posts:
+                del self.ids[url]
+        return tokenized
+
+    def files(self):
+        '''Return {path: bytes} of the files of the index, relative to the
+        output directory.
+        '''
+        def dump(data):
+            return json.dumps(
+                data, sort_keys=True, separators=(',', ':'),
+                ensure_ascii=False,
+            ).encode('utf-8')
+
+        shards = {}
+        for url, (key, title, terms) in self.posts.items():
+            doc = self.ids[url]
+            for term, score in terms.items():
+                shard = shards.setdefault(term[:self.prefix_length], {})
+                shard.setdefault(term, []).append([doc, score])
+
+        files = {}
+        files[search_dirname + '/docs.json'] = dump(dict(
+            prefix_length = self.prefix_length,
+            docs = dict(
+                (str(self.ids[url]), [url, title])
+                for url, (key, title, terms) in self.posts.items()
+            ),
+        ))
+        for prefix, shard in shards.items():
+            for postings in shard.values():
+                postings.sort(key=lambda p: (-p[1], p[0]))
+            files['{}/terms/{}.json'.format(search_dirname, prefix)] = \
+                dump(shard)
+        return files
+
+    def save(self):
+        save_pickle(self.path, search_cache_version, dict(
+            ids = self.ids,
+            next_id = self.next_id,
+            posts = self.posts,
+        ))
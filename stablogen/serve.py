@@ -0,0 +1,304 @@
+# Preview server that renders pages when they're asked for instead of
+# generating the whole site, see Preview.
+
+# Python Standard Library
+import os
+import shutil
+import threading
+import traceback
+import mimetypes
+from collections import OrderedDict
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local
+from stablogen.config import *
+from stablogen.Post import *
+from stablogen.Site import Site
+from stablogen.Page import Page
+from stablogen.code import code_style
+from stablogen.Manifest import TemplateDeps
+from stablogen.minify import minify_css
+from stablogen.util import hash_file
+from stablogen.generate import setup_jinja, update_globals, fingerprint, \
+    render_page
+
+class Preview:
+    '''Renders the pages of the site in input_dir on demand. Paths are mapped
+    to the same pages generate() makes and rendered pages are kept in a LRU
+    cache of cache_size pages keyed by everything the page is made from, like
+    the keys generate() uses for incremental builds. What every page depends
+    on is worked out when the inputs change, not when a page is asked for, so
+    how long a page takes doesn't depend on how big the site is.
+    '''
+
+    def __init__(self, input_dir, cache_size=256):
+        self.input_dir = input_dir
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Pages are rendered one at a time, Post content and the Jinja
+        # environment are shared.
+        self.lock = threading.RLock()
+        # Input path: (mtime_ns, size, sha1)
+        self.hashes = {}
+        self.site = Site(input_dir).load()
+        self.env = setup_jinja(self.site)
+        self.reset()
+
+    def post_hash(self, post):
+        st = post.source.stat()
+        old = self.hashes.get(post.source)
+        if old is None or old[:2] != (st.st_mtime_ns, st.st_size):
+            old = self.hashes[post.source] = (
+                st.st_mtime_ns, st.st_size, hash_file(post.source)
+            )
+        return old[2]
+
+    def reset(self):
+        '''Work out what's needed to route and key pages again, after the
+        inputs changed.
+        '''
+        with self.lock:
+            self.deps = TemplateDeps(self.env)
+            self.references = {}
+            self.tag_keys = {}
+            self.fingerprints = dict(
+                (name, fingerprint(value, self.post_hash))
+                for name, value in self.env.globals.items()
+            )
+            self.tag_urls = dict(
+                (tag.url, tag.name) for tag in self.site.tags.values()
+            )
+            self.list_tags_key = repr([
+                (t.name, t.url, len(t.posts))
+                for t in self.site.get_most_tagged()
+            ])
+            for post in self.site.posts.values():
+                post.render_content(self.env)
+
+    def update(self, changed):
+        '''Load what changed again, changed being the paths of changed
+        files in the input directory.
+        '''
+        with self.lock:
+            if self.input_dir / config_filename in changed:
+                self.env.globals['config'] = load_config(self.input_dir)
+            posts_dir = self.input_dir / posts_dirname
+            self.site.update([p for p in changed
+                if p.parent == posts_dir and p.suffix in post_file_exts
+            ])
+            update_globals(self.env)
+            self.reset()
+
+    def key(self, name, direct=None):
+        templates, variables = self.deps.closure(name, direct)
+        return repr(templates) + ''.join(
+            var + '=' + self.fingerprints[var]
+            for var in sorted(variables) if var in self.fingerprints
+        )
+
+    def post_key(self, post):
+        digest = self.post_hash(post)
+        if self.references.get(post.url, (None,))[0] != digest:
+            self.references[post.url] = (
+                digest, self.deps.references(post.raw_content)
+            )
+        return digest + self.key('post.html') + self.key(
+            post.url, self.references[post.url][1]
+        )
+
+    def tag_key(self, tag):
+        if tag.name not in self.tag_keys:
+            self.tag_keys[tag.name] = fingerprint(tag.posts, self.post_hash)
+        return self.tag_keys[tag.name] + self.key('tag.html')
+
+    def page_count(self, posts):
+        return Page(posts, self.env.globals['config']['posts_per_page']).length
+
+    def route(self, path):
+        '''Return what to respond with for the URL path: (kind, name, key) of
+        a page to render like render() takes, ("code_css", None, key),
+        ("file", path, None) or None if there's nothing there.
+        '''
+        parts = [p for p in path.split('/') if p]
+        if parts and parts[-1] == 'index.html':
+            parts.pop()
+        rel = '/'.join(parts)
+        # Hidden files and special files and directories aren't served
+        if any(p.startswith('.') or p == '..' for p in parts):
+            return None
+        if parts and parts[0] in (posts_dirname, tags_dirname):
+            return self.route_posts(parts)
+        if parts and parts[0] in (templates_dirname, config_filename):
+            return None
+        if rel == PYGMENTS_CSS_OUTPUT:
+            return 'code_css', None, code_style()
+
+        # Regular pages are at their name without .html or the directory
+        # of index.html
+        names = [rel + '.html', rel + '/index.html'] if rel else ['index.html']
+        for name in names:
+            if (self.input_dir / name).is_file():
+                return 'page', name, self.key(name)
+
+        path = self.input_dir / rel
+        if rel and os.path.splitext(rel)[1] not in RENDER_EXTENTIONS and \
+                path.is_file():
+            return 'file', path, None
+        return None
+
+    def route_posts(self, parts):
+        '''Route the pages under posts and tags.
+        '''
+        per_page = self.env.globals['config']['posts_per_page']
+        if parts[0] == posts_dirname:
+            # Numbers are pages of the index, like in generate() they win
+            # over a post with that URL. The first page has no number.
+            index = None
+            if len(parts) == 1:
+                index = 0
+            elif len(parts) == 2 and parts[1].isdigit() and 1 < int(
+                parts[1]
+            ) <= self.page_count(self.env.globals['latest_posts']):
+                index = int(parts[1]) - 1
+            if index is not None:
+                return 'list_posts', index, (
+                    self.key('list_posts.html') + repr(per_page)
+                )
+            if len(parts) == 2 and parts[1] in self.site.posts:
+                post = self.site.posts[parts[1]]
+                return 'post', post.url, self.post_key(post)
+            return None
+        if len(parts) == 1:
+            return 'list_tags', None, (
+                self.key('list_tags.html') + self.list_tags_key
+            )
+        name = self.tag_urls.get(parts[1])
+        if name is None or len(parts) > 3:
+            return None
+        tag = self.site.tags[name]
+        index = 0
+        if len(parts) == 3:
+            if not parts[2].isdigit():
+                return None
+            index = int(parts[2]) - 1
+            if not 0 < index < self.page_count(tag.posts):
+                return None
+        return 'tag', (name, index), self.tag_key(tag) + repr(per_page)
+
+    def render(self, kind, name, key):
+        '''Return the page as bytes, from the cache if possible.
+        '''
+        with self.lock:
+            cache_key = (
+                kind, repr(name), key,
+                self.env.globals['config']['minify'],
+            )
+            data = self.cache.get(cache_key)
+            if data is not None:
+                self.hits += 1
+                self.cache.move_to_end(cache_key)
+                return data
+            self.misses += 1
+            if kind == 'code_css':
+                text = code_style()
+                if self.env.globals['config']['minify']:
+                    text = minify_css(text)
+            else:
+                text, before = render_page(self.env, kind, name)
+            data = text.encode('utf-8')
+            self.cache[cache_key] = data
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return data
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    '''Serves a Preview, set as the preview attribute of the server.
+    '''
+
+    def log_message(self, *args):
+        if not self.server.quiet:
+            super().log_message(*args)
+
+    def do_HEAD(self):
+        self.respond(False)
+
+    def do_GET(self):
+        self.respond(True)
+
+    def send(self, code, content_type, length, headers=()):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+
+    def respond(self, body):
+        preview = self.server.preview
+        path = unquote(urlsplit(self.path).path)
+        try:
+            with preview.lock:
+                route = preview.route(path)
+                if route is not None and route[0] != 'file':
+                    data = preview.render(*route)
+                # Like a static server, redirect to the directory
+                redirect = route is None and not path.endswith('/') and \
+                    preview.route(path + '/') is not None
+        except Exception:
+            data = traceback.format_exc().encode('utf-8')
+            self.send(500, 'text/plain; charset=utf-8', len(data))
+            if body:
+                self.wfile.write(data)
+            return
+
+        if redirect:
+            self.send(301, 'text/plain', 0, [('Location', path + '/')])
+            return
+        if route is None:
+            data = b'Not Found\n'
+            self.send(404, 'text/plain', len(data))
+        elif route[0] == 'file':
+            # Static files are streamed straight from the input directory
+            file_path = route[1]
+            content_type = mimetypes.guess_type(str(file_path))[0]
+            with file_path.open('rb') as f:
+                self.send(200, content_type or 'application/octet-stream',
+                    os.fstat(f.fileno()).st_size
+                )
+                if body:
+                    shutil.copyfileobj(f, self.wfile)
+            return
+        else:
+            if route[0] == 'code_css':
+                content_type = 'text/css'
+            else:
+                content_type = 'text/html'
+            self.send(200, content_type + '; charset=utf-8', len(data))
+        if body:
+            self.wfile.write(data)
+
+def make_server(preview, port=8000, host='localhost', quiet=False):
+    '''Make a server for preview, port 0 picks a free port. If quiet is
+    True, requests aren't logged.
+    '''
+    server = ThreadingHTTPServer((host, port), PreviewHandler)
+    server.daemon_threads = True
+    server.preview = preview
+    server.quiet = quiet
+    return server
+
+def watch_preview(preview):
+    '''Keep preview up to date with the input directory, runs forever.
+    '''
+    from stablogen.watch import make_watcher
+
+    watcher = make_watcher(preview.input_dir)
+    while True:
+        changed = watcher.wait()
+        try:
+            preview.update(changed)
+        except Exception as e:
+            print('Error: {}'.format(e))
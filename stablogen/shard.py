@@ -0,0 +1,111 @@
+# Splitting the outputs of a build between several builds, which can be on
+# different machines, and checking them when they're merged back together.
+# See generate() and merge().
+
+# Python Standard Library
+import json
+
+# Local
+from stablogen.util import hash_text
+from stablogen.sync import write_file
+
+shard_filename = '.stablogen_shard.json'
+
+def parse_shard(text):
+    '''Parse "i/N", meaning shard i of N where i is from 1 to N. Raises
+    ValueError if it's not valid.
+    '''
+    try:
+        index, count = map(int, text.split('/'))
+    except ValueError:
+        raise ValueError('Invalid shard, expected i/N: ' + repr(text))
+    if not 1 <= index <= count:
+        raise ValueError('Invalid shard, i has to be 1 to N: ' + repr(text))
+    return index, count
+
+def shard_of(rel, count):
+    '''Index from 0 of the shard of count that output path rel belongs to.
+    It's from a hash of the path, so it's the same on every machine.
+    '''
+    return int(hash_text(str(rel))[:8], 16) % count
+
+def in_shard(rel, shard):
+    '''If output path rel belongs to shard, (i, N) like from parse_shard() or
+    None for everything.
+    '''
+    return shard is None or shard_of(rel, shard[1]) == shard[0] - 1
+
+def save_shard(output_dir, shard, planned, outputs):
+    '''Record which shard the output directory has, every output path of the
+    whole site in planned and the paths that are in this shard in outputs.
+    '''
+    write_file(output_dir / shard_filename, json.dumps(dict(
+        index = shard[0],
+        count = shard[1],
+        planned = sorted(planned),
+        outputs = sorted(outputs),
+    ), indent=1, sort_keys=True).encode('utf-8'))
+
+def load_shard(output_dir):
+    '''Return what save_shard() saved or None.
+    '''
+    try:
+        return json.loads((output_dir / shard_filename).read_text())
+    except (OSError, ValueError):
+        return None
+
+def check_shards(shard_dirs):
+    '''Check that shard_dirs are all the shards of one build and that every
+    output is in exactly one of them. Returns (problems, files) where
+    problems is a list of what's wrong and files maps each output path to
+    the directory it's in.
+    '''
+    problems = []
+    files = {}
+    shards = {}
+    planned = None
+    for d in shard_dirs:
+        info = load_shard(d)
+        if info is None:
+            problems.append('"{}" is not the output of a shard'.format(d))
+            continue
+        index, count = info['index'], info['count']
+        if index in shards:
+            problems.append('Shard {} is in both "{}" and "{}"'.format(
+                index, shards[index][0], d
+            ))
+            continue
+        shards[index] = (d, count)
+        if planned is None:
+            planned = info['planned']
+        elif info['planned'] != planned:
+            problems.append(
+                '"{}" was built from a different input'.format(d)
+            )
+        for rel in info['outputs']:
+            if rel in files:
+                problems.append('"{}" is in both "{}" and "{}"'.format(
+                    rel, files[rel], d
+                ))
+            elif not (d / rel).is_file():
+                problems.append('"{}" is missing from "{}"'.format(rel, d))
+            else:
+                files[rel] = d
+
+    counts = set(count for d, count in shards.values())
+    if len(counts) > 1:
+        problems.append('Shards are of different numbers of shards: {}'
+            .format(', '.join(map(str, sorted(counts)))))
+        return problems, files
+    missing = [
+        index for index in range(1, max(counts or [0]) + 1)
+        if index not in shards
+    ]
+    for index in missing:
+        problems.append('Shard {}/{} is missing'.format(index, max(counts)))
+    # If a shard is missing, so is everything in it
+    if not missing:
+        for rel in planned or []:
+            if rel not in files:
+                problems.append('"{}" isn\'t in any shard'.format(rel))
+    return problems, files
@@ -0,0 +1,80 @@
+# Sorted index of the post files, so commands that look up posts by the start
+# of their URL slug don't have to list the posts directory, see SlugIndex.
+
+# Python Standard Library
+import os
+import time
+from bisect import bisect_left
+
+# Local
+from stablogen.config import *
+from stablogen.cache import load_pickle, save_pickle
+
+slug_cache_version = 1
+
+# A listing isn't trusted if the directory changed less than this long before
+# it was made, since a file added in the same tick of a coarse mtime wouldn't
+# change the mtime again.
+racy_ns = 2 * 10 ** 9
+
+class SlugIndex:
+    '''Sorted names of the post files in posts_dir, kept in cache_path along
+    with the mtime of posts_dir when they were listed. Adding or removing a
+    file changes the mtime of the directory, so it's only listed again when
+    that happens.
+    '''
+
+    def __init__(self, posts_dir, cache_path):
+        self.posts_dir = posts_dir
+        self.cache_path = cache_path
+        self.names = []
+        self.mtime_ns = None
+        self.load()
+
+    @classmethod
+    def for_input(cls, input_dir):
+        return cls(
+            input_dir / posts_dirname,
+            input_dir / cache_dirname / 'slugs.pickle',
+        )
+
+    def load(self):
+        try:
+            mtime_ns = os.stat(str(self.posts_dir)).st_mtime_ns
+        except FileNotFoundError:
+            # No posts yet
+            return
+        cached = load_pickle(self.cache_path, slug_cache_version)
+        if cached is not None and cached['mtime_ns'] == mtime_ns and \
+                cached['listed_ns'] - mtime_ns >= racy_ns:
+            self.names = cached['names']
+            self.mtime_ns = mtime_ns
+            return
+        self.refresh(mtime_ns)
+
+    def refresh(self, mtime_ns):
+        listed_ns = time.time_ns()
+        with os.scandir(str(self.posts_dir)) as entries:
+            # The type comes with the listing, so files aren't stat()ed
+            self.names = sorted(
+                e.name for e in entries
+                if e.name.endswith(post_file_exts) and e.is_file()
+            )
+        self.mtime_ns = mtime_ns
+        save_pickle(self.cache_path, slug_cache_version, dict(
+            names = self.names,
+            mtime_ns = mtime_ns,
+            listed_ns = listed_ns,
+        ))
+
+    def find(self, prefix):
+        '''Paths of the post files with names starting with prefix, like
+        find_files(posts_dir, prefix, post_file_exts, False), sorted.
+        '''
+        i = bisect_left(self.names, prefix)
+        paths = []
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            paths.append(self.posts_dir / self.names[i])
+            i += 1
+        return paths
+
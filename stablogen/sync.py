@@ -0,0 +1,321 @@
+# Python Standard Library
+import os
+import shutil
+import tempfile
+import ctypes
+from concurrent.futures import ThreadPoolExecutor
+
+# Local
+from stablogen.util import hash_file
+
+# Linux ioctl to make dst share src's data (a reflink), from linux/fs.h
+FICLONE = 0x40049409
+
+# renameat2() flag to swap two paths atomically, from linux/fs.h
+RENAME_EXCHANGE = 2
+AT_FDCWD = -100
+
+# mkstemp() makes files only the owner can read, written files get the
+# permissions open() would have given them.
+umask = os.umask(0)
+os.umask(umask)
+
+# Files at least this big are copied on the thread pool
+large_file_size = 1 << 20
+
+copy_modes = ('copy', 'hardlink', 'reflink')
+
+def is_hidden(name):
+    return name.startswith('.')
+
+def scan_tree(root, skip=()):
+    '''Find the directories and files in root using os.scandir, without
+    going into hidden directories or the paths in skip. Returns (dirs, files)
+    where dirs is a list of pathlib.Path and files is a list of
+    (pathlib.Path, os.stat_result). What isn't a file or directory is put in
+    files with None for the stat result.
+    '''
+    skip = set(str(p) for p in skip)
+    dirs = []
+    files = []
+    todo = [root]
+    while todo:
+        directory = todo.pop()
+        with os.scandir(str(directory)) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            if is_hidden(entry.name) or entry.path in skip:
+                continue
+            path = directory / entry.name
+            if entry.is_dir():
+                dirs.append(path)
+                todo.append(path)
+            elif entry.is_file():
+                files.append((path, entry.stat()))
+            else:
+                files.append((path, None))
+    return dirs, files
+
+def same_file(src_stat, dst):
+    '''If dst already has the same contents as the source, judged by the size
+    and mtime, which copy_file() keeps the same.
+    '''
+    try:
+        st = dst.stat()
+    except OSError:
+        return False
+    return (
+        st.st_size == src_stat.st_size and
+        st.st_mtime_ns == src_stat.st_mtime_ns
+    )
+
+def copy_file(src, dst, src_stat, mode='copy'):
+    '''Copy src to dst using mode, one of copy_modes, falling back to a
+    regular copy if linking isn't possible, like when src and dst are on
+    different filesystems. The mtime of src is kept, so same_file() works.
+    '''
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+
+    if mode == 'hardlink':
+        try:
+            os.link(str(src), str(dst))
+            return
+        except OSError:
+            pass
+
+    with src.open('rb') as s, dst.open('wb') as d:
+        done = False
+        if mode == 'reflink':
+            try:
+                import fcntl
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                done = True
+            except (ImportError, OSError):
+                pass
+        if not done and hasattr(os, 'copy_file_range'):
+            # Copies in the kernel, some filesystems will share the data
+            try:
+                remaining = src_stat.st_size
+                while remaining > 0:
+                    n = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+                done = remaining == 0
+            except OSError:
+                s.seek(0)
+                d.seek(0)
+                d.truncate()
+        if not done:
+            shutil.copyfileobj(s, d)
+    os.utime(str(dst), ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+def sync_file(src, dst, src_stat, mode='copy'):
+    '''Copy src to dst unless dst is already the same. If only the mtime is
+    different, the contents are compared by hash before copying. Returns True
+    if it was copied.
+    '''
+    if same_file(src_stat, dst):
+        return False
+    try:
+        st = dst.stat()
+        if st.st_size == src_stat.st_size and hash_file(src) == hash_file(dst):
+            os.utime(str(dst), ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            return False
+    except OSError:
+        pass
+    copy_file(src, dst, src_stat, mode)
+    return True
+
+class Copier:
+    '''Copies files, small files right away and large ones on a thread pool.
+    Use as a context manager, all the copies are done when it exits.
+    '''
+
+    def __init__(self, mode='copy', threads=4):
+        if mode not in copy_modes:
+            raise ValueError('Invalid copy mode: ' + repr(mode))
+        self.mode = mode
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.futures = []
+        self.copied = 0
+
+    def copy(self, src, dst, src_stat):
+        if src_stat.st_size >= large_file_size:
+            self.futures.append(
+                self.pool.submit(sync_file, src, dst, src_stat, self.mode)
+            )
+        elif sync_file(src, dst, src_stat, self.mode):
+            self.copied += 1
+
+    def wait(self):
+        '''Wait for the copies that were started.
+        '''
+        futures, self.futures = self.futures, []
+        for future in futures:
+            if future.result():
+                self.copied += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown()
+        self.wait()
+        return False
+
+class DirectoryOutput:
+    '''Where generate() puts the outputs of a site that's built into the
+    directory root. Paths are relative to root. Copies are made by a Copier
+    with copy_mode, flush() waits for them and close() when done.
+    '''
+
+    def __init__(self, root, copy_mode='copy'):
+        self.root = root
+        self.copier = Copier(copy_mode)
+
+    def mkdir(self, rel):
+        (self.root / rel).mkdir(parents=True, exist_ok=True)
+
+    def write(self, rel, data):
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return write_file(path, data)
+
+    def copy(self, src, rel, src_stat):
+        self.copier.copy(src, self.root / rel, src_stat)
+
+    def flush(self):
+        self.copier.wait()
+
+    def close(self):
+        self.copier.__exit__(None, None, None)
+
+def write_file(path, data):
+    '''Write bytes to path unless it already has exactly them, so unchanged
+    files keep their mtime. The file is replaced by renaming a temporary file
+    over it, never written in place, so it's never half written and files
+    hardlinked from another tree, like by link_tree(), aren't changed. Returns
+    True if it was written.
+    '''
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, str(path))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+def walk_files(root, skip=()):
+    '''Yield (path relative to root as a string, os.DirEntry) for all the
+    files in root, hidden or not, except the ones in skip.
+    '''
+    todo = [(str(root), '')]
+    while todo:
+        directory, prefix = todo.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                rel = prefix + entry.name
+                if entry.is_dir():
+                    # Like os.walk(), links to directories aren't followed
+                    if not entry.is_symlink():
+                        todo.append((entry.path, rel + '/'))
+                elif rel not in skip:
+                    yield rel, entry
+
+def list_files(root, skip=()):
+    '''Paths of all the files in root, hidden or not, relative to root as
+    strings, except the ones in skip.
+    '''
+    return [rel for rel, entry in walk_files(root, skip)]
+
+def link_tree(src, dst):
+    '''Make dst a copy of the directory src where the files are hardlinks,
+    so it's quick and takes no space. Files are copied if they can't be
+    linked.
+    '''
+    for dirpath, dirnames, filenames in os.walk(str(src)):
+        target = os.path.join(str(dst), os.path.relpath(dirpath, str(src)))
+        os.makedirs(target, exist_ok=True)
+        for name in filenames:
+            link_file(
+                os.path.join(dirpath, name), os.path.join(target, name)
+            )
+
+def link_file(src, dst):
+    '''Make dst a hardlink of src, or a copy if it can't be linked.
+    '''
+    try:
+        os.link(src, dst, follow_symlinks=False)
+    except OSError:
+        shutil.copy2(src, dst, follow_symlinks=False)
+
+def relink_paths(src, dst, paths):
+    '''Make dst the same as the directory src for the given paths relative to
+    both, by hardlinking them from src or removing them from dst if they're
+    not in src. Directories left empty by removing files are removed. This is
+    how a tree made by link_tree() is brought up to date without linking
+    everything again.
+    '''
+    for rel in paths:
+        s = os.path.join(str(src), rel)
+        d = os.path.join(str(dst), rel)
+        if os.path.lexists(d):
+            os.unlink(d)
+        if os.path.lexists(s):
+            os.makedirs(os.path.dirname(d), exist_ok=True)
+            link_file(s, d)
+            continue
+        parent = os.path.dirname(d)
+        while parent != str(dst):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+def swap_dirs(new, old, keep=False):
+    '''Put the directory new where old is and remove what was there, or if
+    keep is True, put it where new was. On Linux both are swapped at once
+    using renameat2(), so something serving old never sees it missing or half
+    built, elsewhere old is renamed out of the way first. Returns True if
+    what was at old was kept at new.
+    '''
+    new = str(new)
+    old = str(old)
+    if not os.path.lexists(old):
+        os.rename(new, old)
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        swapped = libc.renameat2(
+            AT_FDCWD, os.fsencode(new), AT_FDCWD, os.fsencode(old),
+            RENAME_EXCHANGE
+        ) == 0
+    except (AttributeError, OSError):
+        swapped = False
+    if swapped:
+        # new now has what old had
+        if not keep:
+            shutil.rmtree(new)
+        return keep
+    # No renameat2 or the filesystem doesn't support it
+    previous = old + '.previous'
+    if os.path.lexists(previous):
+        shutil.rmtree(previous)
+    os.rename(old, previous)
+    os.rename(new, old)
+    if keep:
+        os.rename(previous, new)
+    else:
+        shutil.rmtree(previous)
+    return keep
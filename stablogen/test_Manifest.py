@@ -0,0 +1,75 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from .Manifest import Manifest
+
+class Manifest_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, manifest, rel, *parts):
+        if manifest.needs_build(self.output_dir, rel, *parts):
+            path = self.output_dir / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(''.join(parts))
+            return True
+        return False
+
+    def test_unchanged_outputs_are_skipped(self):
+        m = Manifest()
+        self.assertTrue(self.build(m, 'a/index.html', 'x'))
+        m.save(self.output_dir)
+
+        m = Manifest.load(self.output_dir)
+        self.assertFalse(self.build(m, 'a/index.html', 'x'))
+        self.assertTrue(self.build(m, 'b/index.html', 'y'))
+        m.save(self.output_dir)
+
+        m = Manifest.load(self.output_dir)
+        self.assertTrue(self.build(m, 'a/index.html', 'changed'))
+        (self.output_dir / 'b/index.html').unlink()
+        self.assertTrue(self.build(m, 'b/index.html', 'y'))
+
+    def test_memo(self):
+        calls = []
+        def make():
+            calls.append(1)
+            return ['value']
+        m = Manifest()
+        self.assertEqual(m.memo('a', 'hash', make), ['value'])
+        m.save(self.output_dir)
+
+        m = Manifest.load(self.output_dir)
+        self.assertEqual(m.memo('a', 'hash', make), ['value'])
+        self.assertEqual(len(calls), 1)
+        m.memo('a', 'other hash', make)
+        self.assertEqual(len(calls), 2)
+
+    def test_stale_outputs_are_removed(self):
+        m = Manifest()
+        self.build(m, 'a/index.html', 'x')
+        self.build(m, 'b/c/index.html', 'y')
+        m.save(self.output_dir)
+
+        m = Manifest.load(self.output_dir)
+        self.build(m, 'a/index.html', 'x')
+        self.assertEqual(m.stale(), ['b/c/index.html'])
+        m.remove_stale(self.output_dir)
+        self.assertFalse((self.output_dir / 'b').exists())
+        self.assertTrue((self.output_dir / 'a/index.html').is_file())
+
+    def test_input_hash_reused(self):
+        (self.output_dir / 'in').write_text('abc')
+        m = Manifest()
+        digest = m.input_hash(self.output_dir, self.output_dir / 'in')
+        old = Manifest(inputs=m.inputs)
+        old.old_inputs['in'][2] = 'cached'
+        self.assertEqual(
+            old.input_hash(self.output_dir, self.output_dir / 'in'), 'cached'
+        )
+        self.assertNotEqual(digest, 'cached')
@@ -41,3 +41,24 @@ class Page_Tests(unittest.TestCase):
         self.assertTrue(p.get_pageno() == 1)
         self.assertTrue(p.get_items() == [])
         self.assertTrue(p.length == 1)
+
+    def test_pages_share_sequence(self):
+        test_data = list(range(25))
+        p = Page(test_data, 10)
+        self.assertTrue(p.length == 3)
+        pages = list(p.pages())
+        self.assertTrue([i.get_pageno() for i in pages] == [1, 2, 3])
+        self.assertTrue(pages[2].get_items() == [20, 21, 22, 23, 24])
+        self.assertTrue(all(i.items is test_data for i in pages))
+
+    def test_generator(self):
+        p = Page((i for i in range(5)), 2)
+        self.assertTrue(p.length == 3)
+        self.assertTrue(p.get_next().get_items() == [2, 3])
+
+    def test_urls(self):
+        p = Page(list(range(25)), 10)
+        self.assertTrue(p.url('/posts') == '/posts/')
+        self.assertTrue(p.next_url('/posts') == '/posts/2/')
+        self.assertTrue(p.get_next().prev_url('/posts') == '/posts/')
+        self.assertRaises(IndexError, lambda: Page([1], 1, 1))
@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+import arrow
+
+from .Post import Post, Tag, PostIndex
+
+class PostIndex_Tests(unittest.TestCase):
+    def setUp(self):
+        def post(title, created, when, tags):
+            return Post(title, '', tags=tags,
+                created = arrow.get(created),
+                when = None if when is None else arrow.get(when),
+            )
+        self.posts = [
+            post('a', '2016-01-01', '2016-01-05', ['x']),
+            post('b', '2016-01-02', '2016-03-01', ['x', 'y']),
+            post('c', '2016-01-03', None, ['y']),
+            post('d', '2016-01-04', '2017-02-01', []),
+        ]
+        self.tags = {}
+        for p in self.posts:
+            for name in p.tags:
+                if name in self.tags:
+                    self.tags[name].add_post(p)
+                else:
+                    self.tags[name] = Tag(name, [p])
+        self.index = PostIndex(self.posts, self.tags.values())
+
+    def titles(self, posts):
+        return [p.title for p in posts]
+
+    def test_sorted_views(self):
+        self.assertEqual(self.titles(self.index.by_when), ['d', 'b', 'a'])
+        self.assertEqual(self.titles(self.index.drafts), ['c'])
+        self.assertEqual(
+            self.titles(self.index.by_created), ['d', 'c', 'b', 'a']
+        )
+
+    def test_tags(self):
+        self.assertFalse(self.tags['x'].posts is self.tags['y'].posts)
+        self.tags['x'].add_post(self.posts[0])
+        self.assertEqual(self.titles(self.tags['x'].posts), ['a', 'b'])
+        self.assertTrue(self.index.tagged(self.posts[1], 'y'))
+        self.assertFalse(self.index.tagged(self.posts[0], 'y'))
+        self.assertFalse(self.index.tagged(self.posts[0], 'z'))
+
+    def test_archive(self):
+        self.assertEqual(self.index.years(), [2017, 2016])
+        self.assertEqual(
+            self.index.months(), [(2017, 2), (2016, 3), (2016, 1)]
+        )
+        self.assertEqual(self.titles(self.index.archive(2016)), ['b', 'a'])
+        self.assertEqual(self.titles(self.index.archive(2016, 3)), ['b'])
+        self.assertEqual(self.titles(self.index.archive(2016, 2)), [])
+
+class Post_Load_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_content_is_loaded_lazily(self):
+        post = Post('Some Title', 'Body \u00e9\n\nSecond paragraph\n',
+            tags = ['x'], extension = '.html',
+        )
+        post.created = arrow.get('2016-01-01')
+        post.save(self.dir)
+
+        loaded = Post.load(self.dir / 'some_title.html')
+        self.assertEqual(loaded.title, 'Some Title')
+        self.assertEqual(loaded.tags, ['x'])
+        self.assertIsNone(loaded._raw_content)
+        self.assertEqual(loaded.raw_content, post.raw_content)
+        loaded.release()
+        self.assertIsNone(loaded._raw_content)
+        self.assertEqual(loaded.raw_content, post.raw_content)
@@ -0,0 +1,78 @@
+import pickle
+import unittest
+import tempfile
+from pathlib import Path
+
+from .Site import Site
+from .config import posts_dirname
+from .benchmark import make_site
+from .generate import generate, generate_batch
+from .sync import list_files
+
+class Site_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        make_site(self.dir / 'a', posts=5, tags=2, code_blocks=0)
+        make_site(self.dir / 'b', posts=3, tags=0, code_blocks=0, seed=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sites_are_separate(self):
+        a = Site(self.dir / 'a').load()
+        b = Site(self.dir / 'b').load()
+        self.assertEqual(len(a.posts), 5)
+        self.assertEqual(len(b.posts), 3)
+        self.assertEqual(b.tags, {})
+        self.assertEqual(
+            sum(len(t.posts) for t in a.tags.values()),
+            sum(len(p.tags) for p in a.posts.values()),
+        )
+        # Finalized, every tenth post is a draft
+        self.assertEqual(len(a.get_finalized()), 5)
+
+    def test_update(self):
+        site = Site(self.dir / 'a').load()
+        path = self.dir / 'a' / posts_dirname / 'post_number_0.html'
+        path.unlink()
+        site.update([path])
+        self.assertNotIn('post_number_0', site.posts)
+        self.assertEqual(len(site.get_index().by_created), 4)
+
+    def test_records(self):
+        site = Site(self.dir / 'a').load()
+        post = site.posts['post_number_1']
+        self.assertFalse(hasattr(post, '__dict__'))
+        posts, tags = pickle.loads(pickle.dumps((site.posts, site.tags)))
+        copy = posts['post_number_1']
+        self.assertEqual(copy.tags, post.tags)
+        for name in copy.tags:
+            self.assertIs(name, tags[name].name)
+            self.assertIn(copy, tags[name])
+
+    def check_batch(self, jobs):
+        sites = [
+            (self.dir / 'a', self.dir / 'batch_a'),
+            (self.dir / 'b', self.dir / 'batch_b'),
+        ]
+        self.assertEqual(generate_batch(sites, jobs=jobs, threads=2), [])
+        for input_dir, output_dir in sites:
+            single = output_dir.parent / (output_dir.name + '_single')
+            generate(input_dir, single)
+            files = [f for f in list_files(single) if not f.startswith('.')]
+            self.assertEqual(
+                files,
+                [f for f in list_files(output_dir) if not f.startswith('.')]
+            )
+            for rel in files:
+                self.assertEqual(
+                    (output_dir / rel).read_bytes(),
+                    (single / rel).read_bytes(), rel
+                )
+
+    def test_batch(self):
+        self.check_batch(1)
+
+    def test_batch_jobs(self):
+        self.check_batch(2)
@@ -0,0 +1,115 @@
+import io
+import gzip
+import unittest
+import tarfile
+import zipfile
+import tempfile
+from pathlib import Path
+
+from .archive import ArchiveOutput, archive_format
+from .benchmark import make_site
+from .generate import generate
+from .sync import list_files
+from .compress import Compressor
+
+class archive_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_archive_format(self):
+        self.assertEqual(archive_format(Path('site.tar')), 'tar')
+        self.assertEqual(archive_format(Path('site.tgz')), 'tar.gz')
+        self.assertEqual(archive_format(Path('a/site.tar.xz')), 'tar.xz')
+        self.assertEqual(archive_format(Path('site.ZIP')), 'zip')
+        self.assertIsNone(archive_format(Path('output')))
+
+    def make(self, name):
+        src = self.dir / 'src.txt'
+        src.write_bytes(b'copied')
+        output = ArchiveOutput(self.dir / name)
+        output.write('b/index.html', b'b')
+        output.copy(src, 'a/src.txt', src.stat())
+        output.mkdir('empty')
+        output.close()
+        return (self.dir / name).read_bytes()
+
+    def test_tar(self):
+        data = self.make('site.tar.gz')
+        self.assertEqual(data, self.make('site.tar.gz'))
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.assertEqual(tar.getnames(),
+                ['a', 'a/src.txt', 'b', 'b/index.html', 'empty']
+            )
+            self.assertEqual(tar.extractfile('a/src.txt').read(), b'copied')
+            self.assertEqual(tar.getmember('b/index.html').mtime, 0)
+
+    def test_zip(self):
+        data = self.make('site.zip')
+        self.assertEqual(data, self.make('site.zip'))
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertEqual(zf.namelist(),
+                ['a/', 'a/src.txt', 'b/', 'b/index.html', 'empty/']
+            )
+            self.assertEqual(zf.read('b/index.html'), b'b')
+
+    def test_spool(self):
+        output = ArchiveOutput(self.dir / 'site.tar')
+        output.write('a.html', b'old')
+        output.write('b.html', b'b')
+        output.write('a.html', b'new')
+        # Only where the outputs are in the spool is kept
+        self.assertEqual(output.files['a.html'], (4, 3))
+        self.assertEqual(output.read('a.html'), b'new')
+        self.assertEqual(output.size('b.html'), 1)
+        output.close()
+        self.assertIsNone(output.spool)
+        self.assertEqual(
+            [p.name for p in self.dir.iterdir()], ['site.tar']
+        )
+        with tarfile.open(str(self.dir / 'site.tar')) as tar:
+            self.assertEqual(tar.getnames(), ['a.html', 'b.html'])
+            self.assertEqual(tar.extractfile('a.html').read(), b'new')
+
+    def test_compress_threads(self):
+        output = ArchiveOutput(self.dir / 'site.tar')
+        rels = ['{}.html'.format(i) for i in range(200)]
+        for rel in rels:
+            output.write(rel, rel.encode('utf-8') * 1000)
+        with Compressor(['gzip', 'bz2'], 1, threads=8) as compressor:
+            for rel in rels:
+                compressor.compress_output(output, rel)
+        self.assertEqual(compressor.written, 400)
+        for rel in rels:
+            self.assertEqual(
+                gzip.decompress(output.read(rel + '.gz')),
+                rel.encode('utf-8') * 1000
+            )
+            self.assertEqual(output.read(rel), rel.encode('utf-8') * 1000)
+        output.close()
+
+    def test_same_as_directory(self):
+        input_dir = self.dir / 'input'
+        make_site(input_dir, posts=15, tags=3, code_blocks=1)
+        generate(input_dir, self.dir / 'output')
+        generate(input_dir, self.dir / 'site.tar')
+        files = sorted(
+            f for f in list_files(self.dir / 'output')
+            if not f.startswith('.')
+        )
+        with tarfile.open(str(self.dir / 'site.tar')) as tar:
+            members = [m for m in tar.getmembers() if m.isfile()]
+            self.assertEqual([m.name for m in members], files)
+            for m in members:
+                self.assertEqual(
+                    tar.extractfile(m).read(),
+                    (self.dir / 'output' / m.name).read_bytes(), m.name
+                )
+        # Nothing but the archive was written
+        self.assertEqual(
+            sorted(p.name for p in self.dir.iterdir()),
+            ['input', 'output', 'site.tar']
+        )
@@ -0,0 +1,32 @@
+import unittest
+import json
+
+from .assets import AssetMap, fingerprinted_path
+
+class assets_Tests(unittest.TestCase):
+    def test_fingerprinted_path(self):
+        self.assertEqual(
+            fingerprinted_path('static/style.css', '0123456789abcdef'),
+            'static/style.0123456789.css'
+        )
+        self.assertEqual(
+            fingerprinted_path('app.min.js', '0123456789abcdef'),
+            'app.min.0123456789.js'
+        )
+
+    def test_asset(self):
+        asset = AssetMap({'static/style.css': 'static/style.0123456789.css'})
+        self.assertEqual(
+            asset('/static/style.css'), '/static/style.0123456789.css'
+        )
+        self.assertEqual(
+            asset('static/style.css'), 'static/style.0123456789.css'
+        )
+        self.assertEqual(asset('/static/code.css'), '/static/code.css')
+        self.assertEqual(AssetMap()('/static/style.css'), '/static/style.css')
+
+    def test_manifest(self):
+        assets = {'static/style.css': 'static/style.0123456789.css'}
+        self.assertEqual(
+            json.loads(AssetMap(assets).manifest().decode('utf-8')), assets
+        )
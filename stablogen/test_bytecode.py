@@ -0,0 +1,45 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from .bytecode import Environment, BytecodeCache
+
+class Environment_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        BytecodeCache.memory.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def env(self):
+        return Environment(string_bytecode_cache=BytecodeCache(self.dir))
+
+    def test_from_string_is_cached(self):
+        env = self.env()
+        self.assertEqual(env.from_string('{{ 1 + 1 }}').render(), '2')
+        self.assertEqual(env.from_string('{{ 1 + 1 }}').render(), '2')
+        self.assertEqual(env.string_memory_hits, 1)
+        self.assertEqual(env.string_bytecode_cache.misses, 1)
+
+        env = self.env()
+        self.assertEqual(env.from_string('{{ 1 + 1 }}').render(), '2')
+        self.assertEqual(env.string_bytecode_cache.hits, 1)
+        self.assertEqual(env.from_string('{{ 2 + 2 }}').render(), '4')
+        self.assertEqual(env.string_bytecode_cache.misses, 1)
+
+    def test_shared_in_memory(self):
+        env = self.env()
+        self.assertEqual(env.from_string('{{ 3 + 3 }}').render(), '6')
+        # Another site, with its own cache directory
+        other = self.dir / 'other'
+        other.mkdir()
+        env = Environment(string_bytecode_cache=BytecodeCache(other))
+        self.assertEqual(env.from_string('{{ 3 + 3 }}').render(), '6')
+        self.assertEqual(env.string_bytecode_cache.hits, 1)
+        self.assertEqual(list(other.iterdir()), [])
+
+    def test_without_cache(self):
+        env = Environment()
+        self.assertEqual(env.from_string('{{ x }}').render(x=3), '3')
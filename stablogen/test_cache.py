@@ -0,0 +1,53 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from .cache import FileCache
+
+class FileCache_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.file = self.dir / 'post.html'
+        self.file.write_text('a')
+        self.cache_path = self.dir / '.cache' / 'test.pickle'
+        self.made = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make(self):
+        self.made += 1
+        return self.file.read_text()
+
+    def get(self, version=1):
+        cache = FileCache(self.cache_path, version)
+        value = cache.get(self.file, self.make)
+        cache.save()
+        return value
+
+    def test_unchanged_file_uses_cache(self):
+        self.assertEqual(self.get(), 'a')
+        self.assertEqual(self.get(), 'a')
+        self.assertEqual(self.made, 1)
+
+    def test_changed_file_is_remade(self):
+        self.get()
+        self.file.write_text('bb')
+        self.assertEqual(self.get(), 'bb')
+        self.assertEqual(self.made, 2)
+
+    def test_version_change_invalidates(self):
+        self.get()
+        self.get(version=2)
+        self.assertEqual(self.made, 2)
+
+    def test_corrupt_cache_is_ignored(self):
+        self.get()
+        self.cache_path.write_bytes(b'garbage')
+        self.assertEqual(self.get(), 'a')
+        self.assertEqual(self.made, 2)
+        self.assertEqual(
+            [p.name for p in self.cache_path.parent.iterdir()],
+            ['test.pickle']
+        )
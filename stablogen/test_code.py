@@ -0,0 +1,37 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from .code import HighlightCache, highlight_code
+
+class HighlightCache_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_as_uncached(self):
+        cache = HighlightCache()
+        for full in (True, False):
+            code = 'def f(x):\n    return x\n'
+            self.assertEqual(
+                cache.get(full, 'python', code),
+                highlight_code(full, 'python', code)
+            )
+        self.assertEqual(cache.misses, 2)
+        cache.get(True, 'python', code)
+        self.assertEqual(cache.hits, 1)
+
+    def test_disk_cache_is_shared(self):
+        HighlightCache(self.dir).get(True, 'c', 'int x;')
+        cache = HighlightCache(self.dir)
+        cache.get(True, 'c', 'int x;')
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+    def test_prune(self):
+        cache = HighlightCache(self.dir, max_bytes=0)
+        cache.get(True, 'c', 'int x;')
+        cache.prune()
+        self.assertEqual(list(self.dir.glob('*/*')), [])
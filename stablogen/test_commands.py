@@ -0,0 +1,49 @@
+import os
+import sys
+import unittest
+import subprocess
+from pathlib import Path
+
+# Modules that take a long time to import and that commands like -p and -t
+# don't need.
+heavy_modules = (
+    'jinja2', 'pygments', 'PIL', 'arrow', 'yaml', 'concurrent.futures'
+)
+
+# Most importing stablogen.commands should take, in seconds. It's about 50ms,
+# this leaves room for slow machines.
+import_time_budget = 0.15
+
+root = Path(__file__).resolve().parent.parent
+
+def run_python(*args, check=True):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(root)
+    return subprocess.run([sys.executable] + list(args),
+        env = env, check = check, universal_newlines = True,
+        stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+    )
+
+class Startup_Tests(unittest.TestCase):
+    def test_heavy_modules_not_imported(self):
+        result = run_python('-c',
+            'import sys, stablogen.commands\n'
+            'print(" ".join(m for m in {!r} if m in sys.modules))'
+            .format(heavy_modules)
+        )
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_import_time(self):
+        # The quickest of a few, so a busy machine doesn't fail it
+        times = []
+        for i in range(3):
+            result = run_python(
+                '-X', 'importtime', '-c', 'import stablogen.commands'
+            )
+            # Lines are "import time: self [us] | cumulative | name"
+            for line in result.stderr.splitlines():
+                parts = [part.strip() for part in line.split('|')]
+                if parts[-1] == 'stablogen.commands':
+                    times.append(int(parts[1]) / 1e6)
+        self.assertEqual(len(times), 3)
+        self.assertLess(min(times), import_time_budget)
@@ -0,0 +1,35 @@
+import bz2
+import gzip
+import lzma
+import unittest
+import tempfile
+from pathlib import Path
+
+from .compress import Compressor, compress_file
+
+class compress_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'index.html'
+        self.data = b'<p>Hello</p>\n' * 100
+        self.path.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compress_file(self):
+        self.assertEqual(compress_file(self.path, ['gzip', 'bz2', 'xz'], 6), 3)
+        for suffix, module in (('.gz', gzip), ('.bz2', bz2), ('.xz', lzma)):
+            compressed = self.path.with_name('index.html' + suffix)
+            self.assertEqual(
+                module.decompress(compressed.read_bytes()), self.data
+            )
+        # Same data, nothing is written
+        self.assertEqual(compress_file(self.path, ['gzip', 'bz2', 'xz'], 6), 0)
+
+    def test_compressor(self):
+        with Compressor('gzip') as compressor:
+            compressor.compress(self.path)
+        self.assertEqual(compressor.written, 1)
+        with self.assertRaises(ValueError):
+            Compressor(['brotli'])
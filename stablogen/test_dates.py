@@ -0,0 +1,44 @@
+import pickle
+import unittest
+from datetime import datetime, timezone
+
+import arrow
+
+from .dates import Timestamp
+
+class Timestamp_Tests(unittest.TestCase):
+    def test_parse_and_str(self):
+        for text in (
+            '2016-01-02T03:04:05+00:00',
+            '2016-01-02T03:04:05.123456-05:00',
+        ):
+            t = Timestamp.get(text)
+            self.assertEqual(str(t), str(arrow.get(text)))
+        self.assertEqual(
+            Timestamp.get('2016-01-02T03:04:05').datetime.tzinfo, timezone.utc
+        )
+        self.assertIsNone(Timestamp.get(None))
+
+    def test_like_arrow(self):
+        a = arrow.get('2016-12-31T23:00:00-05:00')
+        t = Timestamp.get(a)
+        self.assertEqual(t, a)
+        self.assertEqual(t.format('YYYY-MM-DD'), a.format('YYYY-MM-DD'))
+        self.assertEqual(t.format('MMMM D, YYYY'), a.format('MMMM D, YYYY'))
+        self.assertEqual(t.to('utc').year, 2017)
+        self.assertEqual(t.humanize(a), 'just now')
+
+    def test_compare(self):
+        a = Timestamp.get('2016-01-01T00:00:00+00:00')
+        b = Timestamp.get('2016-01-01T01:00:00+01:00')
+        c = Timestamp.get(datetime(2016, 1, 2, tzinfo=timezone.utc))
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertLess(a, c)
+        self.assertLess(a, arrow.get('2016-01-02'))
+        self.assertEqual(sorted([c, a]), [a, c])
+
+    def test_pickle(self):
+        t = Timestamp.get('2016-01-01T00:00:00+00:00')
+        t.humanize()
+        self.assertEqual(pickle.loads(pickle.dumps(t)), t)
@@ -0,0 +1,28 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from .deploy import DeployManifest, deploy_filename
+
+class DeployManifest_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_diff(self):
+        (self.dir / 'a').write_text('a')
+        (self.dir / 'b').write_text('b')
+        old = DeployManifest.scan(self.dir)
+        old.save(self.dir)
+
+        (self.dir / 'b').write_text('changed')
+        (self.dir / 'a').unlink()
+        (self.dir / 'c').write_text('c')
+        old = DeployManifest.load(self.dir)
+        new = DeployManifest.scan(self.dir, old, [deploy_filename])
+        self.assertEqual(new.diff(old), dict(
+            added = ['c'], changed = ['b'], removed = ['a'],
+        ))
@@ -0,0 +1,115 @@
+import pickle
+import shutil
+import unittest
+from unittest import mock
+import tempfile
+from pathlib import Path
+
+from .benchmark import make_site
+from .Site import Site
+from .sync import list_files
+from .Post import Post
+from .config import posts_dirname
+from . import generate as gen
+
+def read_tree(output_dir):
+    '''Contents of the files of the site in output_dir, without the files
+    about the build.
+    '''
+    return dict(
+        (rel, (output_dir / rel).read_bytes())
+        for rel in list_files(output_dir) if not rel.startswith('.')
+    )
+
+class generate_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input_dir = self.dir / 'input'
+        make_site(self.input_dir, posts=30, tags=4, code_blocks=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_jobs_same_as_serial(self):
+        gen.generate(self.input_dir, self.dir / 'serial')
+        gen.generate(self.input_dir, self.dir / 'jobs', jobs=3)
+        serial = read_tree(self.dir / 'serial')
+        self.assertTrue(serial)
+        self.assertEqual(read_tree(self.dir / 'jobs'), serial)
+
+    def test_render_in_worker(self):
+        env = gen.setup_jinja(Site(self.input_dir).load())
+        site = env.site
+        for post in site.posts.values():
+            post.render_content(env)
+        state = pickle.dumps((site.posts, site.tags, dict(
+            (name, env.globals[name]) for name in gen.build_globals
+        )))
+        url = next(iter(site.posts))
+        try:
+            gen.init_worker(self.input_dir, state)
+            self.assertEqual(
+                gen.render_in_worker(('post', url, True)),
+                gen.render_output(env, 'post', url, True)
+            )
+            text, before, links = gen.render_in_worker(
+                ('list_tags', None, False)
+            )
+            self.assertIn('tag_0', text)
+            self.assertIsNone(links)
+        finally:
+            gen.worker_env = None
+
+    def test_staging_kept(self):
+        output_dir = self.dir / 'output'
+        staging = gen.staging_dir(output_dir)
+        gen.generate(self.input_dir, output_dir)
+        gen.generate(self.input_dir, output_dir)
+        first = read_tree(output_dir)
+        # The last build is kept to build the next one in
+        self.assertEqual(read_tree(staging), first)
+        self.assertTrue((staging / gen.staging_marker).is_file())
+
+        # Change, add and remove posts
+        posts = sorted((self.input_dir / posts_dirname).iterdir())
+        posts[0].unlink()
+        post = Post.load(posts[1])
+        post.raw_content = 'Changed'
+        post.save(self.input_dir / posts_dirname)
+        post.title = 'Added post'
+        post.url = 'added_post'
+        post.save(self.input_dir / posts_dirname)
+        for incremental in (True, False):
+            gen.generate(self.input_dir, output_dir, incremental)
+            self.assertEqual(read_tree(staging), first)
+            first = read_tree(output_dir)
+        self.assertIn('posts/added_post/index.html', first)
+        gen.generate(self.input_dir, self.dir / 'fresh')
+        self.assertEqual(first, read_tree(self.dir / 'fresh'))
+
+        # Not used if it isn't of the build before the output
+        shutil.rmtree(str(output_dir))
+        gen.generate(self.input_dir, output_dir, True)
+        self.assertEqual(read_tree(output_dir), first)
+        self.assertFalse(staging.exists())
+
+    def test_pygments_changes_rebuild(self):
+        output_dir = self.dir / 'output'
+        gen.generate(self.input_dir, output_dir)
+
+        def rendered_posts():
+            with mock.patch.object(gen, 'render_page',
+                wraps=gen.render_page
+            ) as render_page:
+                gen.generate(self.input_dir, output_dir, True)
+            return [
+                call[0][2] for call in render_page.call_args_list
+                if call[0][1] == 'post'
+            ]
+
+        self.assertEqual(rendered_posts(), [])
+        with mock.patch.object(gen.pygments, '__version__', '0.0'):
+            self.assertEqual(len(rendered_posts()), 30)
+        with mock.patch.object(gen, 'style_key', lambda: 'other style'):
+            self.assertEqual(len(rendered_posts()), 30)
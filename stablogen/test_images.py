@@ -0,0 +1,74 @@
+import io
+import unittest
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+
+from .images import Image, ImageSet, derivative_path, build_images
+from .sync import DirectoryOutput
+from .util import hash_file
+
+class images_Tests(unittest.TestCase):
+    def test_derivative_path(self):
+        self.assertEqual(
+            derivative_path('static/photo.jpg', 480), 'static/photo-480w.jpg'
+        )
+
+    def test_srcset(self):
+        srcset = ImageSet({
+            'static/a.jpg': (1000, [(480, 'static/a-480w.jpg')]),
+        })
+        self.assertEqual(srcset('/static/a.jpg'),
+            '/static/a-480w.jpg 480w, /static/a.jpg 1000w')
+        self.assertEqual(srcset('/static/b.jpg'), '/static/b.jpg')
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_build_images(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            src = tmp / 'a.png'
+            Image.new('RGB', (100, 50)).save(str(src))
+            output_dir = tmp / 'output'
+            output_dir.mkdir()
+            built = []
+
+            def needs_build(rel, *parts):
+                built.append(rel)
+                return True
+
+            output = DirectoryOutput(output_dir)
+            srcset = build_images([('a.png', src)], output,
+                tmp / 'cache', [20, 40, 200], 85, hash_file, needs_build
+            )
+            output.close()
+            self.assertEqual(built, ['a-20w.png', 'a-40w.png'])
+            self.assertEqual(srcset('a.png'),
+                'a-20w.png 20w, a-40w.png 40w, a.png 100w')
+            with Image.open(str(output_dir / 'a-40w.png')) as image:
+                self.assertEqual(image.size, (40, 20))
+
+    @unittest.skipIf(Image is None, 'Pillow is not installed')
+    def test_unreadable_image(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            good = tmp / 'good.png'
+            Image.new('RGB', (100, 50)).save(str(good))
+            bad = tmp / 'bad.png'
+            bad.write_bytes(b'not a png')
+            output_dir = tmp / 'output'
+            output_dir.mkdir()
+
+            for i in range(2):
+                out = io.StringIO()
+                output = DirectoryOutput(output_dir)
+                with redirect_stdout(out):
+                    srcset = build_images(
+                        [('bad.png', bad), ('good.png', good)], output,
+                        tmp / 'cache', [40], 85, hash_file,
+                        lambda rel, *parts: True
+                    )
+                output.close()
+                self.assertIn('Could not read image "bad.png"', out.getvalue())
+                self.assertEqual(srcset('bad.png'), 'bad.png')
+                self.assertEqual(srcset('good.png'),
+                    'good-40w.png 40w, good.png 100w')
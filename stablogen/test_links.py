@@ -0,0 +1,132 @@
+import io
+import unittest
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+
+from .links import find_links, page_url, resolve, LinkReport
+from .benchmark import make_site
+from .generate import generate
+from .test_commands import root, run_python
+
+class links_Tests(unittest.TestCase):
+    def test_find_links(self):
+        self.assertEqual(find_links(
+            '<a href="/posts/a">A</a> <img src=b.png>'
+            "<a href='/tags/x?page=1&amp;y=2#top'>"
+            '<a href="#top"> <a href="https://example.com/">'
+            '<a href="mailto:a@example.com"> <script src="//cdn/x.js">'
+            '<a href="/posts/a">Again</a> <img srcset="c.png 2x">'
+        ), ['/posts/a', '/tags/x?page=1&y=2#top', 'b.png'])
+
+    def test_page_url(self):
+        self.assertEqual(page_url('index.html'), '/')
+        self.assertEqual(page_url('posts/a/index.html'), '/posts/a/')
+        self.assertEqual(page_url('404.html'), '/404.html')
+
+    def test_resolve(self):
+        routes = {
+            'index.html', 'posts/a/index.html', 'static/style.css',
+            'tags/a_tag/index.html',
+        }
+        base = '/posts/a/'
+        self.assertEqual(resolve('/', base, routes), 'index.html')
+        self.assertEqual(resolve('/posts/a', base, routes),
+            'posts/a/index.html'
+        )
+        self.assertEqual(resolve('/posts/a/#x', base, routes),
+            'posts/a/index.html'
+        )
+        self.assertEqual(resolve('../../static/style.css?v=1', base, routes),
+            'static/style.css'
+        )
+        self.assertEqual(resolve('/tags/a_tag', base, routes),
+            'tags/a_tag/index.html'
+        )
+        # The name of a tag isn't where its page is
+        self.assertIsNone(resolve('/tags/a tag', base, routes))
+        self.assertIsNone(resolve('/tags/a%20tag', base, routes))
+        self.assertIsNone(resolve('/posts/b', base, routes))
+
+    def test_report(self):
+        routes = ['index.html', 'a/index.html', 'b/index.html', 'c.css']
+        report = LinkReport(routes, {
+            'index.html': ['/a', '/c.css', '/missing'],
+            'a/index.html': ['/', '/a/', '/missing'],
+            'b/index.html': ['/b'],
+        })
+        self.assertEqual(report.dangling, [
+            ('a/index.html', '/missing'), ('index.html', '/missing'),
+        ])
+        # Linking to itself doesn't count
+        self.assertEqual(report.orphans, ['b/index.html'])
+        self.assertEqual(report.lines()[0],
+            'Dangling link /missing in 2 pages, like a/index.html'
+        )
+        self.assertEqual(
+            LinkReport(routes, {'b/index.html': []}, orphans=False).orphans,
+            []
+        )
+
+    def make_site(self, input_dir):
+        make_site(input_dir, posts=20, tags=3, code_blocks=0)
+        (input_dir / 'index.html').write_text(
+            '{% for post in latest_posts %}'
+            '<a href="/posts/{{ post.url }}">{{ post.title }}</a>'
+            '{% endfor %}<a href="/posts/gone">Gone</a>'
+        )
+        (input_dir / 'hidden.html').write_text('Nothing links here')
+
+    def test_generate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = Path(tmp) / 'input'
+            output_dir = Path(tmp) / 'output'
+            self.make_site(input_dir)
+            out = io.StringIO()
+            with redirect_stdout(out):
+                report = generate(input_dir, output_dir, check_links=True)
+            dangling = set(link for rel, link in report.dangling)
+            self.assertIn('/posts/gone', dangling)
+            # Tags have spaces in their names, but are linked to by URL
+            self.assertFalse([l for l in dangling if l.startswith('/tags/')])
+            self.assertEqual(report.orphans, ['hidden/index.html'])
+            lines = out.getvalue().splitlines()
+            self.assertIn('Dangling link /posts/gone in index.html', lines)
+            self.assertIn('Orphaned page: hidden/index.html', lines)
+            self.assertIn('Links: {} dangling, 1 orphaned pages'.format(
+                len(report.dangling)
+            ), lines)
+
+            # Nothing is built again, the links are remembered
+            again_out = io.StringIO()
+            with redirect_stdout(again_out):
+                again = generate(input_dir, output_dir, True,
+                    check_links=True
+                )
+            self.assertEqual(again.dangling, report.dangling)
+            self.assertEqual(again.orphans, report.orphans)
+            self.assertEqual(again_out.getvalue(), out.getvalue())
+
+            # Or read from the pages if they weren't checked last time
+            unchecked_out = io.StringIO()
+            with redirect_stdout(unchecked_out):
+                generate(input_dir, output_dir, True)
+            self.assertNotIn('Links:', unchecked_out.getvalue())
+            with redirect_stdout(io.StringIO()):
+                again = generate(input_dir, output_dir, True,
+                    check_links=True
+                )
+                self.assertIsNone(generate(input_dir, output_dir, True))
+            self.assertEqual(again.dangling, report.dangling)
+
+    def test_exit_code(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = Path(tmp) / 'input'
+            self.make_site(input_dir)
+            for args in ([], ['--profile', str(Path(tmp) / 'trace.json')]):
+                result = run_python(str(root / 'bin' / 'stablogen'),
+                    '-i', str(input_dir), '-g', str(Path(tmp) / 'output'),
+                    '--check-links', *args, check=False
+                )
+                self.assertEqual(result.returncode, 1, args)
+                self.assertIn('Dangling link /posts/gone', result.stdout)
@@ -0,0 +1,51 @@
+import unittest
+
+from .minify import minify_html, minify_css, MinifyStats
+
+class minify_Tests(unittest.TestCase):
+    def test_minify_html(self):
+        self.assertEqual(minify_html(
+            '<html>\n <head> <!-- comment --> <title> T </title>\n'
+            '<script>\n var a  =  1;\n</script></head>\n'
+            '<body>  <p>a   <b>b</b>   c</p>\n'
+            '  <pre>\n  x   y\n</pre>  <div> t </div>\n</body></html>\n'
+        ),
+            '<html><head><title>T</title>'
+            '<script>\n var a  =  1;\n</script></head>'
+            '<body><p>a <b>b</b> c</p>\n'
+            '<pre>\n  x   y\n</pre> <div> t </div></body></html>'
+        )
+
+    def test_inline_space_is_kept(self):
+        # Lists like the tags of a post are displayed inline by CSS, so the
+        # space between the items shows
+        self.assertEqual(minify_html(
+            '<ul class="inline_tags">\n'
+            '    <li><a href="/tags/a">a</a></li>\n'
+            '    <li><a href="/tags/b">b</a></li>\n'
+            '</ul>  <a href="/x">x</a>   <a href="/y">y</a>'
+        ),
+            '<ul class="inline_tags">\n'
+            '<li><a href="/tags/a">a</a></li>\n'
+            '<li><a href="/tags/b">b</a></li>\n'
+            '</ul> <a href="/x">x</a> <a href="/y">y</a>'
+        )
+
+    def test_codebox_is_kept(self):
+        html = (
+            '<div class="codebox">f.py<button class="code-copy-btn"></button>'
+            '<hr><div class="code-copy"><div class="highlight"><pre>'
+            '<span></span>def f():\n    return  1\n</pre></div></div></div>'
+        )
+        self.assertEqual(minify_html(html), html)
+
+    def test_minify_css(self):
+        self.assertEqual(minify_css(
+            '/* comment */\n.a :hover , .b > .c {\n  color : red ;\n'
+            '  content: "a ;}  b";\n}\n'
+        ), '.a :hover,.b>.c{color :red;content:"a ;}  b"}')
+
+    def test_stats(self):
+        stats = MinifyStats()
+        self.assertEqual(stats.minify('css', 'a { b: c; }'), 'a{b:c}')
+        self.assertEqual(stats.types['css'], (1, 11, 6))
@@ -0,0 +1,48 @@
+import json
+import unittest
+import tempfile
+from pathlib import Path
+
+from .Post import Post
+from .search import SearchIndex, strip_html, tokenize
+
+class search_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / 'search.pickle'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_strip_html(self):
+        self.assertEqual(tokenize(strip_html(
+            '<p>Hello <b>World</b> &amp; a</p><script>var x;</script>'
+        )), ['hello', 'world'])
+
+    def test_index(self):
+        posts = [
+            Post('Jinja Tricks', '<p>Templates</p>', ['python'], url='a'),
+            Post('Other', '<p>More templates</p>', [], url='b'),
+        ]
+        index = SearchIndex(self.path)
+        tokenized = index.update(posts, lambda p: p.raw_content)
+        self.assertEqual(len(tokenized), 2)
+        files = index.files()
+        docs = json.loads(files['search/docs.json'].decode('utf-8'))
+        self.assertEqual(docs['docs'], {'0': ['a', 'Jinja Tricks'],
+            '1': ['b', 'Other']})
+        terms = json.loads(files['search/terms/te.json'].decode('utf-8'))
+        self.assertEqual(terms['templates'], [[0, 1], [1, 1]])
+        terms = json.loads(files['search/terms/py.json'].decode('utf-8'))
+        self.assertEqual(terms['python'], [[0, 5]])
+        index.save()
+
+        # Only changed posts are tokenized again and IDs stay the same
+        posts[1].content = '<p>Changed</p>'
+        index = SearchIndex(self.path)
+        tokenized = index.update(posts[1:], lambda p: p.raw_content)
+        self.assertEqual(tokenized, posts[1:])
+        files = index.files()
+        self.assertNotIn('search/terms/py.json', files)
+        terms = json.loads(files['search/terms/ch.json'].decode('utf-8'))
+        self.assertEqual(terms['changed'], [[1, 1]])
@@ -0,0 +1,63 @@
+import unittest
+import tempfile
+import threading
+import urllib.request
+import urllib.error
+from pathlib import Path
+
+from .serve import Preview, make_server
+from .generate import generate
+from .benchmark import make_site
+from .sync import list_files
+
+class Preview_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.input_dir = self.dir / 'input'
+        make_site(self.input_dir, posts=25, tags=3, code_blocks=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_as_generate(self):
+        output_dir = self.dir / 'output'
+        generate(self.input_dir, output_dir)
+        preview = Preview(self.input_dir)
+        files = [f for f in list_files(output_dir) if not f.startswith('.')]
+        for rel in files:
+            path = '/' + rel
+            if path.endswith('/index.html'):
+                path = path[:-len('index.html')]
+            route = preview.route(path)
+            self.assertIsNotNone(route, path)
+            if route[0] == 'file':
+                data = route[1].read_bytes()
+            else:
+                data = preview.render(*route)
+            self.assertEqual(data, (output_dir / rel).read_bytes(), path)
+        self.assertIsNone(preview.route('/posts/nothing/'))
+        self.assertIsNone(preview.route('/templates/page.html'))
+
+    def test_cache(self):
+        preview = Preview(self.input_dir, cache_size=2)
+        for path in ('/posts/', '/posts/', '/tags/', '/posts/post_number_0/'):
+            preview.render(*preview.route(path))
+        self.assertEqual((preview.hits, preview.misses), (1, 3))
+        self.assertEqual(len(preview.cache), 2)
+
+    def test_server(self):
+        server = make_server(Preview(self.input_dir), 0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = 'http://localhost:{}'.format(server.server_address[1])
+        try:
+            with urllib.request.urlopen(url + '/posts/post_number_1/') as r:
+                self.assertIn(b'Post number 1', r.read())
+            with urllib.request.urlopen(url + '/static/style.css') as r:
+                self.assertEqual(r.headers['Content-Type'], 'text/css')
+            with self.assertRaises(urllib.error.HTTPError) as e:
+                urllib.request.urlopen(url + '/nothing/')
+            self.assertEqual(e.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,77 @@
+import filecmp
+import unittest
+import tempfile
+from pathlib import Path
+
+from .shard import parse_shard, shard_of, in_shard, save_shard, check_shards
+from .benchmark import make_site, run_command
+from .sync import list_files
+
+class shard_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/3'), (2, 3))
+        for text in ('0/3', '4/3', '3', 'a/b'):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_every_path_in_one_shard(self):
+        paths = ['posts/post_{}/index.html'.format(i) for i in range(100)]
+        for path in paths:
+            self.assertEqual(shard_of(path, 4), shard_of(path, 4))
+            self.assertEqual(
+                sum(in_shard(path, (i, 4)) for i in range(1, 5)), 1
+            )
+        self.assertTrue(all(in_shard(path, None) for path in paths))
+
+    def test_check_shards(self):
+        planned = ['a', 'b', 'c']
+        dirs = [self.dir / '1', self.dir / '2']
+        for d, (index, outputs) in zip(dirs, ((1, ['a']), (2, ['b', 'c']))):
+            d.mkdir()
+            for rel in outputs:
+                (d / rel).write_text(rel)
+            save_shard(d, (index, 2), planned, outputs)
+        problems, files = check_shards(dirs)
+        self.assertEqual(problems, [])
+        self.assertEqual(files, dict(a=dirs[0], b=dirs[1], c=dirs[1]))
+
+        problems, files = check_shards(dirs[:1])
+        self.assertEqual(problems, ['Shard 2/2 is missing'])
+
+        (dirs[1] / 'c').unlink()
+        problems, files = check_shards(dirs)
+        self.assertEqual(len(problems), 2)
+
+    def test_shards_in_processes(self):
+        input_dir = self.dir / 'input'
+        make_site(input_dir, posts=12, tags=3, code_blocks=1)
+        full = self.dir / 'full'
+        merged = self.dir / 'merged'
+        run_command(input_dir, '-g', str(full))
+        shards = []
+        for i in range(1, 4):
+            shards.append(self.dir / 'shard{}'.format(i))
+            run_command(input_dir, '-g', str(shards[-1]),
+                '--shard', '{}/3'.format(i)
+            )
+        run_command(input_dir, '-g', str(merged),
+            '--merge', *map(str, shards)
+        )
+
+        files = sorted(
+            f for f in list_files(full) if not f.startswith('.stablogen')
+        )
+        self.assertEqual(files, sorted(
+            f for f in list_files(merged) if not f.startswith('.stablogen')
+        ))
+        match, mismatch, errors = filecmp.cmpfiles(
+            str(full), str(merged), files, shallow=False
+        )
+        self.assertEqual(mismatch + errors, [])
@@ -0,0 +1,50 @@
+import os
+import unittest
+import tempfile
+from pathlib import Path
+
+from .slugs import SlugIndex
+from .config import posts_dirname
+from .util import find_files
+
+class SlugIndex_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = Path(self.tmp.name)
+        self.posts_dir = self.input_dir / posts_dirname
+        self.posts_dir.mkdir()
+        for name in ('foo.html', 'foo_bar.html', 'fop.html', 'bar.html',
+                'notes.txt'):
+            (self.posts_dir / name).write_text('')
+        (self.posts_dir / 'foo_dir.html').mkdir()
+        self.age()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def age(self):
+        # Old enough for the listing to be trusted
+        os.utime(str(self.posts_dir), ns=(10 ** 18, 10 ** 18))
+
+    def test_find(self):
+        index = SlugIndex.for_input(self.input_dir)
+        for prefix in ('foo', 'fo', 'foo_', 'bar', 'x', ''):
+            self.assertEqual(index.find(prefix), sorted(
+                find_files(self.posts_dir, prefix, ('.html',), False)
+            ), prefix)
+
+    def test_cached(self):
+        SlugIndex.for_input(self.input_dir)
+        # Not seen, since the mtime of the directory is the same
+        (self.posts_dir / 'foo_baz.html').write_text('')
+        self.age()
+        index = SlugIndex.for_input(self.input_dir)
+        self.assertEqual(len(index.find('foo')), 2)
+        # Seen when the directory changes
+        os.utime(str(self.posts_dir))
+        index = SlugIndex.for_input(self.input_dir)
+        self.assertEqual(len(index.find('foo')), 3)
+
+    def test_no_posts_dir(self):
+        index = SlugIndex.for_input(self.input_dir / 'nothing')
+        self.assertEqual(index.find('foo'), [])
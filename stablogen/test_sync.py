@@ -0,0 +1,112 @@
+import os
+import unittest
+import tempfile
+from pathlib import Path
+
+from .sync import scan_tree, sync_file, Copier, write_file, list_files, \
+    link_tree, relink_paths, swap_dirs
+
+class sync_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.src = self.dir / 'src'
+        self.dst = self.dir / 'dst'
+        for p in ('a/b/c.txt', 'a/.hidden/d.txt', '.e.txt', 'skip/f.txt'):
+            path = self.src / p
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(p)
+        self.dst.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_tree(self):
+        dirs, files = scan_tree(self.src, skip=[self.src / 'skip'])
+        self.assertEqual(
+            sorted(p.relative_to(self.src) for p in dirs),
+            [Path('a'), Path('a/b')]
+        )
+        self.assertEqual(
+            [p.relative_to(self.src) for p, st in files],
+            [Path('a/b/c.txt')]
+        )
+
+    def test_sync_file(self):
+        src = self.src / 'a/b/c.txt'
+        dst = self.dst / 'c.txt'
+        self.assertTrue(sync_file(src, dst, src.stat()))
+        self.assertEqual(dst.read_text(), 'a/b/c.txt')
+        self.assertFalse(sync_file(src, dst, src.stat()))
+
+        # Same contents, different mtime
+        os.utime(str(dst), ns=(0, 0))
+        self.assertFalse(sync_file(src, dst, src.stat()))
+        self.assertEqual(dst.stat().st_mtime_ns, src.stat().st_mtime_ns)
+
+        src.write_text('changed')
+        self.assertTrue(sync_file(src, dst, src.stat()))
+        self.assertEqual(dst.read_text(), 'changed')
+
+    def test_copy_modes(self):
+        src = self.src / 'a/b/c.txt'
+        for mode in ('copy', 'hardlink', 'reflink'):
+            dst = self.dst / mode
+            with Copier(mode) as copier:
+                copier.copy(src, dst, src.stat())
+            self.assertEqual(copier.copied, 1)
+            self.assertEqual(dst.read_text(), 'a/b/c.txt')
+
+    def test_write_file(self):
+        path = self.dst / 'x.txt'
+        self.assertTrue(write_file(path, b'x'))
+        os.utime(str(path), ns=(0, 0))
+        self.assertFalse(write_file(path, b'x'))
+        self.assertEqual(path.stat().st_mtime_ns, 0)
+        self.assertTrue(write_file(path, b'y'))
+        self.assertEqual(path.read_bytes(), b'y')
+
+    def test_link_tree_and_swap(self):
+        new = self.dir / 'new'
+        link_tree(self.src, new)
+        self.assertEqual(
+            sorted(list_files(new, ['skip/f.txt'])),
+            sorted(['a/b/c.txt', 'a/.hidden/d.txt', '.e.txt'])
+        )
+        # Writing to the copy doesn't change the original
+        write_file(new / 'a/b/c.txt', b'changed')
+        self.assertEqual((self.src / 'a/b/c.txt').read_text(), 'a/b/c.txt')
+
+        swap_dirs(new, self.src)
+        self.assertFalse(new.exists())
+        self.assertEqual((self.src / 'a/b/c.txt').read_text(), 'changed')
+
+    def test_swap_keep(self):
+        new = self.dir / 'new'
+        link_tree(self.src, new)
+        write_file(new / 'a/b/c.txt', b'changed')
+        self.assertTrue(swap_dirs(new, self.src, keep=True))
+        self.assertEqual((self.src / 'a/b/c.txt').read_text(), 'changed')
+        # What was replaced is kept where new was
+        self.assertEqual((new / 'a/b/c.txt').read_text(), 'a/b/c.txt')
+        self.assertFalse(swap_dirs(new, self.dir / 'missing', keep=True))
+        self.assertFalse(new.exists())
+
+    def test_relink_paths(self):
+        old = self.dir / 'old'
+        link_tree(self.src, old)
+        write_file(self.src / 'a/b/c.txt', b'changed')
+        (self.src / 'g').mkdir()
+        write_file(self.src / 'g/h.txt', b'added')
+        (self.src / 'skip/f.txt').unlink()
+        relink_paths(self.src, old, ['a/b/c.txt', 'g/h.txt', 'skip/f.txt'])
+        self.assertEqual(
+            sorted(list_files(old)), sorted(list_files(self.src))
+        )
+        self.assertEqual((old / 'a/b/c.txt').read_text(), 'changed')
+        self.assertEqual(
+            (old / 'g/h.txt').stat().st_ino,
+            (self.src / 'g/h.txt').stat().st_ino
+        )
+        # Left empty
+        self.assertFalse((old / 'skip').exists())
@@ -0,0 +1,84 @@
+import json
+import time
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+
+from . import timing
+
+class timing_Tests(unittest.TestCase):
+    def setUp(self):
+        self.profiler = timing.start()
+
+    def tearDown(self):
+        timing.stop()
+
+    def test_not_profiling(self):
+        timing.stop()
+        self.assertIs(timing.span('phase', 'a'), timing.no_span)
+        with timing.span('phase', 'a'):
+            pass
+
+    def test_nesting(self):
+        with timing.span('phase', 'outer'):
+            with timing.span('post', 'inner', page='x'):
+                time.sleep(0.01)
+        inner, outer = self.profiler.events
+        self.assertEqual((outer['cat'], outer['name']), ('phase', 'outer'))
+        self.assertEqual(inner['args']['page'], 'x')
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(
+            outer['ts'] + outer['dur'], inner['ts'] + inner['dur']
+        )
+        self.assertGreaterEqual(inner['dur'], 10000)
+
+    def test_thread_cpu(self):
+        # Waiting for another thread isn't CPU time of this one
+        def busy():
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                pass
+        with timing.span('phase', 'wait'):
+            thread = threading.Thread(target=busy)
+            thread.start()
+            thread.join()
+        e, = self.profiler.events
+        self.assertGreaterEqual(e['dur'], 50000)
+        self.assertLess(e['args']['thread_cpu_ms'], 25)
+
+    def test_summary_totals(self):
+        for name in ('a', 'b', 'a'):
+            timing.span('phase', name).end()
+        for name in ('p1', 'p2'):
+            with timing.span('post', name), \
+                    timing.span('template', 'post.html'):
+                pass
+        for e in self.profiler.of('phase'):
+            e['dur'] = 1e6
+        summary = self.profiler.summary().splitlines()
+        self.assertEqual(summary[0], 'Phases:')
+        # Phases that happen more than once are added up, in order
+        self.assertEqual(summary[1].split()[:2], ['a', '2.000s'])
+        self.assertEqual(summary[2].split()[:2], ['b', '1.000s'])
+        self.assertIn('Slowest posts:', summary)
+        self.assertIn('post.html (2 renders)', summary[-1])
+
+    def test_trace(self):
+        with timing.span('phase', 'a'):
+            timing.span('highlight', 'python x.py').end()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'trace.json'
+            self.profiler.write_trace(path)
+            trace = json.loads(path.read_text())
+        self.assertEqual(trace['displayTimeUnit'], 'ms')
+        self.assertEqual(
+            [(e['cat'], e['name']) for e in trace['traceEvents']],
+            [('highlight', 'python x.py'), ('phase', 'a')]
+        )
+        for e in trace['traceEvents']:
+            self.assertEqual(e['ph'], 'X')
+            self.assertEqual(e['tid'], threading.get_ident())
+            for key in ('ts', 'dur', 'pid'):
+                self.assertIsInstance(e[key], (int, float))
+            self.assertIn('thread_cpu_ms', e['args'])
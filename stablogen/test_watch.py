@@ -0,0 +1,93 @@
+import io
+import unittest
+import tempfile
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import arrow
+
+from .watch import PollingWatcher
+from .commands import watch
+from .config import posts_dirname, post_file_exts
+from .benchmark import make_site
+from .Post import Post
+
+class ScriptedWatcher:
+    '''Stands in for a watcher, each call to wait() calls the next step,
+    which changes the input and returns what it changed. Stops watch() when
+    there are no steps left.
+    '''
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+
+    def wait(self):
+        if not self.steps:
+            raise KeyboardInterrupt
+        return self.steps.pop(0)()
+
+class watch_Tests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_polling(self):
+        (self.dir / 'sub').mkdir()
+        (self.dir / 'a.txt').write_text('a')
+        (self.dir / 'sub' / 'b.txt').write_text('b')
+        watcher = PollingWatcher(self.dir, interval=0.01)
+
+        (self.dir / 'sub' / 'b.txt').write_text('changed')
+        (self.dir / 'c.txt').write_text('c')
+        (self.dir / '.hidden').write_text('h')
+        self.assertEqual(watcher.wait(), {
+            self.dir / 'sub' / 'b.txt', self.dir / 'c.txt',
+        })
+
+        (self.dir / 'a.txt').unlink()
+        self.assertEqual(watcher.wait(), {self.dir / 'a.txt'})
+
+    def test_bad_post_keeps_watching(self):
+        input_dir = self.dir / 'input'
+        output_dir = self.dir / 'output'
+        make_site(input_dir, posts=3, tags=1, code_blocks=0)
+        posts_dir = input_dir / posts_dirname
+        path = posts_dir / ('new_post' + post_file_exts[0])
+
+        def half_saved():
+            path.write_text('title: [New\n')
+            return {path}
+
+        def missing_tags():
+            path.write_text('title: New post\n\nContent\n')
+            return {path}
+
+        def fixed():
+            post = Post('New post', 'Content', tags=['fixed'],
+                extension=post_file_exts[0]
+            )
+            post.created = post.when = arrow.get('2020-01-01T00:00:00+00:00')
+            post.save(posts_dir)
+            return set()
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            watch(input_dir, output_dir,
+                watcher = ScriptedWatcher(half_saved, missing_tags, fixed)
+            )
+        lines = out.getvalue().splitlines()
+        errors = [l for l in lines if l.startswith('Error: ')]
+        self.assertEqual(len(errors), 2)
+        self.assertIn('KeyError', errors[1])
+        # The post was still loaded once it was fixed, even though the last
+        # change didn't include it
+        self.assertTrue(lines[-1].startswith('Rebuilt in'))
+        self.assertTrue(
+            (output_dir / 'posts' / 'new_post' / 'index.html').is_file()
+        )
+        self.assertTrue(
+            (output_dir / 'tags' / 'fixed' / 'index.html').is_file()
+        )
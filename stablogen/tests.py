@@ -1,2 +1,25 @@
 from .test_Page import *
 from .test_util import *
+from .test_Manifest import *
+from .test_cache import *
+from .test_code import *
+from .test_sync import *
+from .test_bytecode import *
+from .test_Post import *
+from .test_deploy import *
+from .test_compress import *
+from .test_minify import *
+from .test_shard import *
+from .test_serve import *
+from .test_dates import *
+from .test_commands import *
+from .test_search import *
+from .test_images import *
+from .test_assets import *
+from .test_Site import *
+from .test_slugs import *
+from .test_archive import *
+from .test_links import *
+from .test_generate import *
+from .test_watch import *
+from .test_timing import *
@@ -0,0 +1,157 @@
+# Optional timing of builds, see Profiler. Code that wants to be timed uses
+# span(), which does nothing unless a Profiler has been started.
+
+# Python Standard Library
+import os
+import json
+import time
+import threading
+from collections import defaultdict, OrderedDict
+
+# Profiler in use, if any
+active = None
+
+class Span:
+    '''Time from when it's made to when end() is called or the with block
+    it's used in ends. The CPU time is only that of the thread it's in, so
+    work it waits for in other threads isn't counted.
+    '''
+
+    def __init__(self, profiler, cat, name, args):
+        self.profiler = profiler
+        self.cat = cat
+        self.name = name
+        self.args = args
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def end(self):
+        cpu = time.thread_time() - self.cpu
+        end = time.perf_counter()
+        self.args['thread_cpu_ms'] = round(cpu * 1000, 3)
+        self.profiler.events.append(dict(
+            name = self.name,
+            cat = self.cat,
+            ph = 'X',
+            ts = (self.wall - self.profiler.start) * 1e6,
+            dur = (end - self.wall) * 1e6,
+            pid = os.getpid(),
+            tid = threading.get_ident(),
+            args = self.args,
+        ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.end()
+        return False
+
+class NoSpan:
+    '''What span() returns when not profiling.
+    '''
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+no_span = NoSpan()
+
+def span(cat, name, **args):
+    '''Time something if profiling, cat is what kind of thing is being
+    timed, like "phase" or "post", and name is what it is. Use in a with
+    statement or call end() on the result.
+    '''
+    if active is None:
+        return no_span
+    return Span(active, cat, name, args)
+
+def start():
+    global active
+    active = Profiler()
+    return active
+
+def stop():
+    global active
+    profiler, active = active, None
+    return profiler
+
+class Profiler:
+    '''Records the wall time and thread CPU time of spans as Chrome trace
+    events, which can be opened in chrome://tracing or
+    https://ui.perfetto.dev.
+    '''
+
+    def __init__(self):
+        self.events = []
+        self.start = time.perf_counter()
+
+    def of(self, cat):
+        return [e for e in self.events if e['cat'] == cat]
+
+    def write_trace(self, path):
+        path.write_text(json.dumps(dict(
+            traceEvents = self.events,
+            displayTimeUnit = 'ms',
+        )))
+
+    def summary(self, top=10):
+        '''Human readable summary of where the time went, with the top
+        slowest posts, templates and code blocks.
+        '''
+        # Phases can happen more than once, so add them up
+        phases = OrderedDict()
+        for e in self.of('phase'):
+            wall, cpu = phases.get(e['name'], (0, 0))
+            phases[e['name']] = (
+                wall + e['dur'], cpu + e['args']['thread_cpu_ms']
+            )
+        for cat, name in (
+            ('content', 'post content'), ('highlight', 'code'),
+            ('minify', 'minify'),
+        ):
+            events = self.of(cat)
+            if events:
+                phases['(' + name + ')'] = (
+                    sum(e['dur'] for e in events),
+                    sum(e['args']['thread_cpu_ms'] for e in events),
+                )
+        lines = ['Phases:']
+        for name, (wall, cpu) in phases.items():
+            lines.append('  {:<20} {:9.3f}s wall {:9.3f}s thread cpu'.format(
+                name, wall / 1e6, cpu / 1000
+            ))
+
+        def slowest(title, events):
+            events = sorted(events, key=lambda e: e['dur'], reverse=True)
+            if not events:
+                return
+            lines.append('Slowest {}:'.format(title))
+            for e in events[:top]:
+                lines.append('  {:9.3f}ms {}'.format(
+                    e['dur'] / 1e3, e['name']
+                ))
+
+        slowest('posts', self.of('post'))
+        slowest('post content', self.of('content'))
+        slowest('code blocks', self.of('highlight'))
+
+        # Templates are rendered many times, so add them up
+        templates = defaultdict(lambda: [0, 0])
+        for e in self.of('template'):
+            templates[e['name']][0] += e['dur']
+            templates[e['name']][1] += 1
+        if templates:
+            lines.append('Templates (total):')
+            for name, (dur, count) in sorted(
+                templates.items(), key=lambda i: i[1][0], reverse=True
+            )[:top]:
+                lines.append('  {:9.3f}ms {} ({} renders)'.format(
+                    dur / 1e3, name, count
+                ))
+        return '\n'.join(lines)
@@ -1,5 +1,6 @@
 import os
-import itertools 
+import itertools
+import hashlib
 
 def if_none_else_do(val, func):
     ''' Return None if value is none, else return func(val) '''
@@ -73,3 +74,36 @@ def find_file(directory, names=None, exts=None):
     '''
     result = find_files(directory, names, exts)
     return result[0] if result else None
+
+def hash_text(text):
+    '''Return the hex SHA-1 digest of a str or bytes object.
+    '''
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+def hash_file(path, block_size=1 << 20):
+    '''Return the hex SHA-1 digest of a file's contents, read in blocks.
+    '''
+    h = hashlib.sha1()
+    with path.open('rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def process_pool(**kwargs):
+    '''Return a ProcessPoolExecutor, with its workers started by a fork
+    server where there is one. Forking a process that has threads, like
+    generate_batch() and the copier do, can leave a lock held by another
+    thread locked forever in the worker. The fork server imports
+    stablogen.generate once, so the workers don't each have to.
+    '''
+    # Only imported if a pool is needed
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['stablogen.generate'])
+        kwargs['mp_context'] = context
+    return ProcessPoolExecutor(**kwargs)
@@ -0,0 +1,146 @@
+# Python Standard Library
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+def is_hidden(name):
+    return name.startswith('.')
+
+def walk_dirs(root):
+    '''Yield root and all the directories in it that aren't hidden or in a
+    hidden directory.
+    '''
+    yield root
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        dirnames[:] = [d for d in dirnames if not is_hidden(d)]
+        for d in dirnames:
+            yield Path(dirpath) / d
+
+class PollingWatcher:
+    '''Finds changes by looking at the mtime and size of everything every
+    interval seconds.
+    '''
+
+    def __init__(self, root, interval=0.5):
+        self.root = root
+        self.interval = interval
+        self.files = self.snapshot()
+
+    def snapshot(self):
+        files = {}
+        for d in walk_dirs(self.root):
+            try:
+                entries = list(os.scandir(str(d)))
+            except OSError:
+                continue
+            for entry in entries:
+                if is_hidden(entry.name) or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files[entry.path] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def wait(self):
+        '''Block until something changes, then return the set of paths of
+        files that were changed, added or removed.
+        '''
+        while True:
+            time.sleep(self.interval)
+            files = self.snapshot()
+            changed = set(
+                path for path in set(files) | set(self.files)
+                if files.get(path) != self.files.get(path)
+            )
+            self.files = files
+            if changed:
+                return set(map(Path, changed))
+
+class InotifyWatcher:
+    '''Finds changes using Linux's inotify, through ctypes. Raises OSError if
+    it's not available.
+    '''
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_ISDIR = 0x40000000
+    mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+        IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+    event_header = struct.Struct('iIII')
+
+    def __init__(self, root, settle=0.05):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.root = root
+        self.settle = settle
+        self.dirs = {}
+        for d in walk_dirs(root):
+            self.add(d)
+
+    def add(self, directory):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(str(directory)), self.mask
+        )
+        if wd >= 0:
+            self.dirs[wd] = directory
+
+    def read(self):
+        changed = set()
+        data = os.read(self.fd, 1 << 16)
+        i = 0
+        while i < len(data):
+            wd, mask, cookie, length = self.event_header.unpack_from(data, i)
+            i += self.event_header.size
+            name = os.fsdecode(data[i:i + length].rstrip(b'\0'))
+            i += length
+            directory = self.dirs.get(wd)
+            if directory is None or not name or is_hidden(name):
+                continue
+            path = directory / name
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    for d in walk_dirs(path):
+                        self.add(d)
+                        changed.update(
+                            p for p in d.iterdir() if p.is_file()
+                        )
+            else:
+                changed.add(path)
+        return changed
+
+    def wait(self):
+        '''Block until something changes, then return the set of paths of
+        files that were changed, added or removed. Waits for changes to
+        settle first, since editors write files in more than one step.
+        '''
+        changed = set()
+        while not changed:
+            select.select([self.fd], [], [])
+            changed |= self.read()
+            while select.select([self.fd], [], [], self.settle)[0]:
+                changed |= self.read()
+        return changed
+
+def make_watcher(root):
+    '''Watcher for the directory root, using inotify if possible.
+    '''
+    try:
+        return InotifyWatcher(root)
+    except (OSError, AttributeError):
+        return PollingWatcher(root)